@@ -1,154 +1,587 @@
-import requests
-import platform
-import threading
-import time
-import os
-
-# Config
-SERVER_URL = "http://127.0.0.1:5000"
-HEARTBEAT_INTERVAL = 30  # seconds
-IDLE_TIMEOUT = 600  # seconds (10 minutes)
-
-class DCCClient:
-    """
-    A client to communicate with the time tracking server from a DCC application.
-    Now includes idle detection.
-    """
-    def __init__(self, dcc_name):
-        self.dcc_name = dcc_name
-        self.session_id = None
-        self.user_info = None
-        self.machine = platform.node()
-        
-        # Threading and state management
-        self.heartbeat_thread = None
-        self.stop_event = threading.Event()
-        self.is_paused = False
-        self.last_active_time = time.time()
-
-        print(f"DCCClient initialized for {dcc_name} on {self.machine}")
-
-    def get_tasks(self):
-        """Fetches the list of available tasks from the server."""
-        try:
-            response = requests.get(f"{SERVER_URL}/api/tasks", timeout=5)
-            if response.status_code == 200:
-                return response.json().get("tasks", [])
-            return []
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching tasks: {e}")
-            return []
-
-    def login(self, username, password):
-        """Authenticates the user with the server."""
-        payload = {"username": username, "password": password}
-        try:
-            response = requests.post(f"{SERVER_URL}/api/login", json=payload, timeout=5)
-            if response.status_code == 200:
-                self.user_info = response.json().get("user")
-                print(f"Login successful for user: {self.user_info['username']}")
-                return True
-            print(f"Login failed: {response.json().get('message')}")
-            return False
-        except requests.exceptions.RequestException as e:
-            print(f"Login error: Could not connect to the server. {e}")
-            return False
-
-    def start_session(self, project_name, scene_name, task_id):
-        """Starts a new tracking session."""
-        if not self.user_info:
-            print("Cannot start session: User not logged in.")
-            return
-
-        payload = {
-            "user_id": self.user_info['id'], "task_id": task_id,
-            "machine": self.machine, "dcc_name": self.dcc_name,
-            "project_name": project_name, "scene_name": scene_name
-        }
-        try:
-            response = requests.post(f"{SERVER_URL}/api/session/start", json=payload, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                self.session_id = data.get("session_id")
-                print(f"Time tracker session started. ID: {self.session_id}")
-                self._start_background_thread()
-        except requests.exceptions.RequestException as e:
-            print(f"Error starting session: {e}")
-
-    def stop_session(self):
-        """Stops the current tracking session."""
-        if self.session_id is None:
-            return
-        
-        self.stop_event.set() # Signal the background thread to stop
-        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
-            self.heartbeat_thread.join(timeout=5)
-
-        try:
-            requests.post(f"{SERVER_URL}/api/session/stop", json={"session_id": self.session_id}, timeout=5)
-            print(f"Time tracker session stopped. ID: {self.session_id}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error stopping session: {e}")
-        finally:
-            self.session_id = None
-            self.is_paused = False
-
-    def send_heartbeat(self):
-        """Sends a heartbeat to the server and marks the user as active."""
-        if self.session_id is None or self.stop_event.is_set():
-            return
-        
-        # If paused, resume the session first
-        if self.is_paused:
-            self._resume_session()
-
-        self.last_active_time = time.time()
-        try:
-            requests.post(f"{SERVER_URL}/api/session/heartbeat", json={"session_id": self.session_id}, timeout=3)
-            # print(f"Sent heartbeat for session {self.session_id}") # Can be noisy
-        except requests.exceptions.RequestException:
-            print("Heartbeat failed. Server unreachable.")
-    
-    def _pause_session(self):
-        """Internal method to pause the session."""
-        if self.session_id and not self.is_paused:
-            print("User idle. Pausing session...")
-            self.is_paused = True
-            try:
-                requests.post(f"{SERVER_URL}/api/session/pause", json={"session_id": self.session_id}, timeout=5)
-            except requests.exceptions.RequestException as e:
-                print(f"Error pausing session: {e}")
-
-    def _resume_session(self):
-        """Internal method to resume the session."""
-        if self.session_id and self.is_paused:
-            print("User active. Resuming session...")
-            self.is_paused = False
-            try:
-                requests.post(f"{SERVER_URL}/api/session/resume", json={"session_id": self.session_id}, timeout=5)
-            except requests.exceptions.RequestException as e:
-                print(f"Error resuming session: {e}")
-
-    def _background_worker(self):
-        """The main loop for the background thread."""
-        while not self.stop_event.is_set():
-            if self.session_id:
-                # Check for idleness
-                if not self.is_paused and (time.time() - self.last_active_time > IDLE_TIMEOUT):
-                    self._pause_session()
-                
-                # The heartbeat is sent manually by the DCC app,
-                # this thread is just for checking idleness.
-            
-            time.sleep(HEARTBEAT_INTERVAL)
-
-    def _start_background_thread(self):
-        """Starts the background thread for heartbeats and idle checks."""
-        if self.heartbeat_thread is None or not self.heartbeat_thread.is_alive():
-            self.stop_event.clear()
-            self.last_active_time = time.time()
-            self.is_paused = False
-            self.heartbeat_thread = threading.Thread(target=self._background_worker, daemon=True)
-            self.heartbeat_thread.start()
-            print("Idle detection thread started.")
+import requests
+import platform
+import threading
+import queue
+import time
+import os
+import json
+import sqlite3
+import uuid
+import weakref
+from datetime import datetime, timezone
+
+# Config
+SERVER_URL = "http://127.0.0.1:5000"
+HEARTBEAT_INTERVAL = 30  # seconds
+IDLE_TIMEOUT = 600  # seconds (10 minutes)
+SEND_QUEUE_SIZE = 256  # max requests waiting for the sender thread
+SPOOL_BATCH_SIZE = 500  # events per /api/session/sync request
+SPOOL_RETRY_INTERVAL = 30  # seconds between replay attempts while offline
+ACTIVITY_BATCH_SIZE = 50  # activity events buffered before they are queued
+ACTIVITY_FLUSH_INTERVAL = 30  # seconds an activity event may wait in the buffer
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".vfx_time_tracker")
+METADATA_CACHE_FILE = os.path.join(CACHE_DIR, "metadata_cache.json")  # server lists, keyed by server like the tokens
+TOKEN_CACHE_FILE = os.path.join(CACHE_DIR, "auth_token.json")  # login tokens, shared by every DCC
+TOKEN_REFRESH_MARGIN = 3 * 24 * 60 * 60  # seconds before expiry a token is swapped for a new one
+
+def read_json_file(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_json_file(path, data):
+    """Writes JSON atomically. Maya and Blender share these files, so each writer gets its own temp file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+class TrackedSession:
+    """
+    A session as seen by the client. Events refer to it by a client-generated
+    key, so it can be tracked before (or without) the server answering.
+    The server id is filled in by the sender thread once the start is synced.
+    `owner` is the id of the user the session is tracked for.
+    """
+    def __init__(self, owner):
+        self.key = uuid.uuid4().hex
+        self.owner = owner
+        self.server_id = None
+        self.heartbeat_queued = False
+
+class EventSpool:
+    """
+    Append-only SQLite journal of lifecycle events that haven't reached the
+    server yet. Only used from the sender thread. Heartbeats replace any
+    earlier heartbeat for the same session, since only the latest matters.
+    Every running DCC of the same kind shares the file, so each row records
+    the user it belongs to and is only replayed with that user's token.
+    """
+    def __init__(self, path):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=10)
+            self.conn.execute("PRAGMA journal_mode = WAL")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not open tracking spool at {path}, keeping events in memory: {e}")
+            self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_key TEXT NOT NULL,
+                type TEXT NOT NULL,
+                body TEXT NOT NULL,
+                owner INTEGER
+            )
+        """)
+        if "owner" not in {row[1] for row in self.conn.execute("PRAGMA table_info(events)")}:
+            # Spools from before owners were recorded; their rows go to whoever replays first.
+            self.conn.execute("ALTER TABLE events ADD COLUMN owner INTEGER")
+        self.conn.commit()
+
+    def append(self, events):
+        """Writes a batch of (owner, event) pairs in one transaction (one fsync)."""
+        if not events:
+            return
+        with self.conn:
+            for owner, event in events:
+                if event["type"] == "heartbeat":
+                    self.conn.execute("DELETE FROM events WHERE session_key = ? AND type = 'heartbeat'",
+                                      (event["session_key"],))
+                self.conn.execute("INSERT INTO events (session_key, type, body, owner) VALUES (?, ?, ?, ?)",
+                                  (event["session_key"], event["type"], json.dumps(event), owner))
+
+    def peek(self, limit, owner):
+        rows = self.conn.execute("SELECT seq, body FROM events WHERE owner = ? OR owner IS NULL ORDER BY seq LIMIT ?",
+                                 (owner, limit)).fetchall()
+        return [(seq, json.loads(body)) for seq, body in rows]
+
+    def remove_through(self, seq, owner):
+        with self.conn:
+            self.conn.execute("DELETE FROM events WHERE seq <= ? AND (owner = ? OR owner IS NULL)", (seq, owner))
+
+    def count(self, owner=None):
+        """Rows waiting for `owner`, or for anyone if owner is None."""
+        if owner is None:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM events WHERE owner = ? OR owner IS NULL", (owner,)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+class DCCClient:
+    """
+    A client to communicate with the time tracking server from a DCC application.
+    Now includes idle detection.
+    Session calls are queued and sent in order by a background sender thread,
+    so DCC callbacks never wait on the network. Events are journaled to a
+    local spool first, so nothing is lost while the server is unreachable.
+    """
+    def __init__(self, dcc_name):
+        self.dcc_name = dcc_name
+        self.session = None
+        self.user_info = None
+        self.auth = None  # {"token", "expires_at", "user_id"} from /api/login
+        self.machine = platform.node()
+        
+        # Threading and state management
+        self.heartbeat_thread = None
+        self.stop_event = threading.Event()
+        self.is_paused = False
+        self.last_active_time = time.time()
+
+        # Transport queue drained by the sender thread
+        self.send_queue = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.transport_counters = {"sent": 0, "failed": 0, "dropped": 0, "spooled": 0}
+        self.offline = False
+        self.next_replay_time = 0
+        self.sessions_by_key = weakref.WeakValueDictionary()
+
+        # Activity events (saves, renders, undos...) buffered until a size or time threshold
+        self.activity_buffer = []
+        self.activity_buffer_started = 0
+        self.activity_lock = threading.Lock()
+        self.sender_thread = threading.Thread(target=self._sender_worker, daemon=True)
+        self.sender_thread.start()
+
+        # On-disk copy of server lists (tasks, users) keyed by their ETag
+        self.metadata_cache = self._load_metadata_cache()
+
+        print(f"DCCClient initialized for {dcc_name} on {self.machine}")
+
+    def get_tasks(self):
+        """
+        Fetches the list of available tasks from the server.
+        The cached copy is revalidated with its ETag, so an unchanged list costs
+        an empty 304, and the cached list is returned if the server is unreachable.
+        """
+        return self._fetch_cached_list("tasks")
+
+    def get_cached_tasks(self):
+        """Returns the last known task list without contacting the server."""
+        return self.metadata_cache.get("tasks", {}).get("items", [])
+
+    def refresh_tasks(self, on_change=None):
+        """
+        Revalidates the cached task list on a background thread, so a DCC can
+        show get_cached_tasks() straight away instead of waiting on the server.
+        If tasks_version changes, on_change(tasks) is called from that thread.
+        Returns the thread.
+        """
+        def revalidate():
+            version = self.tasks_version
+            tasks = self.get_tasks()
+            if on_change and self.tasks_version != version:
+                on_change(tasks)
+        thread = threading.Thread(target=revalidate, daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def tasks_version(self):
+        """The ETag of the cached task list; changes whenever the list does."""
+        return self.metadata_cache.get("tasks", {}).get("etag")
+
+    def _fetch_cached_list(self, name):
+        """Conditional GET of /api/<name> backed by the on-disk metadata cache."""
+        entry = self.metadata_cache.get(name, {})
+        headers = {"If-None-Match": entry["etag"]} if entry.get("etag") else {}
+        try:
+            response = requests.get(f"{SERVER_URL}/api/{name}", headers=headers, timeout=5)
+            if response.status_code == 304:
+                return entry.get("items", [])
+            if response.status_code == 200:
+                items = response.json().get(name, [])
+                self.metadata_cache[name] = {"etag": response.headers.get("ETag"), "items": items}
+                self._save_metadata_cache()
+                return items
+            return entry.get("items", [])
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {name}: {e}")
+            return entry.get("items", [])
+
+    def _load_metadata_cache(self):
+        return read_json_file(METADATA_CACHE_FILE).get(SERVER_URL, {})
+
+    def _save_metadata_cache(self):
+        caches = read_json_file(METADATA_CACHE_FILE)
+        caches[SERVER_URL] = self.metadata_cache
+        try:
+            write_json_file(METADATA_CACHE_FILE, caches)
+        except OSError as e:
+            print(f"Could not write metadata cache: {e}")
+
+    def login(self, username, password):
+        """Authenticates the user with the server."""
+        payload = {"username": username, "password": password}
+        try:
+            response = requests.post(f"{SERVER_URL}/api/login", json=payload, timeout=5)
+            if response.status_code == 200:
+                data = response.json()
+                self.user_info = data.get("user")
+                self._save_token(data)
+                print(f"Login successful for user: {self.user_info['username']}")
+                return True
+            print(f"Login failed: {response.json().get('message')}")
+            return False
+        except requests.exceptions.RequestException as e:
+            print(f"Login error: Could not connect to the server. {e}")
+            return False
+
+    def restore_login(self):
+        """
+        Logs in with the token saved by an earlier login (in this DCC or another),
+        without contacting the server. Returns False if there is none or it has expired.
+        """
+        saved = read_json_file(TOKEN_CACHE_FILE).get(SERVER_URL)
+        if not saved or saved.get("expires_at", 0) <= time.time() + 60:
+            return False
+        self.auth = {"token": saved["token"], "expires_at": saved["expires_at"], "user_id": saved["user"]["id"]}
+        self.user_info = saved["user"]
+        print(f"Logged in as {self.user_info['username']} with a saved token.")
+        # Anything spooled while logged out can go now.
+        self.next_replay_time = 0
+        return True
+
+    def logout(self):
+        """Forgets the saved token so the next launch asks for a password. Queued events are still sent."""
+        self.user_info = None
+        self._update_token_cache(None)
+
+    def _save_token(self, data):
+        if not data.get("token"):
+            return
+        # A refresh after logout() keeps the user the token was issued to.
+        user_id = self.user_info["id"] if self.user_info else (self.auth or {}).get("user_id")
+        self.auth = {"token": data["token"], "expires_at": data["expires_at"], "user_id": user_id}
+        self.next_replay_time = 0
+        if self.user_info:
+            self._update_token_cache(dict(self.auth, user=self.user_info))
+
+    def _update_token_cache(self, entry):
+        tokens = read_json_file(TOKEN_CACHE_FILE)
+        if entry is None:
+            tokens.pop(SERVER_URL, None)
+        else:
+            tokens[SERVER_URL] = entry
+        try:
+            write_json_file(TOKEN_CACHE_FILE, tokens)
+        except OSError as e:
+            print(f"Could not save login token: {e}")
+
+    def _auth_headers(self, auth=None):
+        auth = auth or self.auth
+        return {"Authorization": f"Bearer {auth['token']}"} if auth else {}
+
+    def _refresh_token_if_due(self):
+        """Swaps a token close to expiry for a new one (a cheap HMAC on the server, no password)."""
+        auth = self.auth
+        if not auth or auth["expires_at"] - time.time() > TOKEN_REFRESH_MARGIN:
+            return
+        try:
+            response = requests.post(f"{SERVER_URL}/api/token/refresh", headers=self._auth_headers(), timeout=5)
+        except requests.exceptions.RequestException:
+            return
+        if response.status_code == 200:
+            self._save_token(response.json())
+
+    @property
+    def session_id(self):
+        """The server's id for the current session, or None until it is known."""
+        return self.session.server_id if self.session else None
+
+    @property
+    def is_tracking(self):
+        """True from the moment start_session is called until stop_session."""
+        return self.session is not None
+
+    def start_session(self, project_name, scene_name, task_id):
+        """Starts a new tracking session."""
+        if not self.user_info:
+            print("Cannot start session: User not logged in.")
+            return
+
+        payload = {
+            "user_id": self.user_info['id'], "task_id": task_id,
+            "machine": self.machine, "dcc_name": self.dcc_name,
+            "project_name": project_name, "scene_name": scene_name
+        }
+        self.session = TrackedSession(self.user_info['id'])
+        self.sessions_by_key[self.session.key] = self.session
+        self._enqueue("start", self.session, payload)
+        self._start_background_thread()
+
+    def stop_session(self):
+        """Stops the current tracking session."""
+        if self.session is None:
+            return
+        
+        self.stop_event.set() # Signal the background thread to stop
+        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
+            self.heartbeat_thread.join(timeout=1)
+
+        self.flush_activity()
+        self._enqueue("stop", self.session)
+        self.session = None
+        self.is_paused = False
+
+    def send_heartbeat(self):
+        """Marks the user as active and queues a heartbeat if one isn't already waiting."""
+        session = self.session
+        if session is None or self.stop_event.is_set():
+            return
+        
+        # If paused, resume the session first
+        if self.is_paused:
+            self._resume_session()
+
+        self.last_active_time = time.time()
+        if not session.heartbeat_queued:
+            session.heartbeat_queued = True
+            self._enqueue("heartbeat", session)
+    
+    def log_event(self, event_type, event_data=None):
+        """
+        Records a fine-grained activity event (scene open, save, render, undo...)
+        for the current session. Events are buffered and sent in batches.
+        """
+        session = self.session
+        if session is None:
+            return
+        if event_data is not None and not isinstance(event_data, str):
+            event_data = json.dumps(event_data)
+        event = {
+            "key": uuid.uuid4().hex, "session_key": session.key, "type": "activity",
+            "event_type": event_type, "event_data": event_data,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        with self.activity_lock:
+            if not self.activity_buffer:
+                self.activity_buffer_started = time.time()
+            self.activity_buffer.append(event)
+            due = (len(self.activity_buffer) >= ACTIVITY_BATCH_SIZE
+                   or time.time() - self.activity_buffer_started >= ACTIVITY_FLUSH_INTERVAL)
+        if due:
+            self.flush_activity()
+
+    def flush_activity(self):
+        """Hands buffered activity events to the sender thread as one batch."""
+        with self.activity_lock:
+            events, self.activity_buffer = self.activity_buffer, []
+        if not events:
+            return
+        try:
+            self.send_queue.put_nowait((events, self.session))
+        except queue.Full:
+            self.transport_counters["dropped"] += len(events)
+            print(f"Send queue full. Dropped {len(events)} activity events.")
+
+    def _pause_session(self):
+        """Internal method to pause the session."""
+        if self.session and not self.is_paused:
+            print("User idle. Pausing session...")
+            self.is_paused = True
+            self._enqueue("pause", self.session)
+
+    def _resume_session(self):
+        """Internal method to resume the session."""
+        if self.session and self.is_paused:
+            print("User active. Resuming session...")
+            self.is_paused = False
+            self._enqueue("resume", self.session)
+
+    def flush(self, timeout=5):
+        """
+        Blocks until every queued request has been journaled and a send attempted,
+        or `timeout` seconds pass. Used on DCC exit so the final stop isn't lost.
+        Returns True if drained.
+        """
+        deadline = time.time() + timeout
+        with self.send_queue.all_tasks_done:
+            while self.send_queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.send_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self):
+        """Lets the sender thread exit once it has sent everything already queued."""
+        try:
+            self.send_queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def transport_stats(self):
+        """Queue depth, spool depth and sent/failed/dropped counters for the sender thread."""
+        stats = dict(self.transport_counters)
+        stats["queue_depth"] = self.send_queue.qsize()
+        stats["queue_size"] = SEND_QUEUE_SIZE
+        stats["offline"] = self.offline
+        return stats
+
+    def _enqueue(self, kind, session, payload=None):
+        event = {
+            "key": uuid.uuid4().hex, "session_key": session.key, "type": kind,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+        if payload:
+            event.update(payload)
+        try:
+            self.send_queue.put_nowait(([event], session))
+        except queue.Full:
+            self.transport_counters["dropped"] += 1
+            if kind == "heartbeat":
+                session.heartbeat_queued = False
+            else:
+                print(f"Send queue full. Dropped '{kind}' request.")
+
+    def _sender_worker(self):
+        """
+        Journals queued events to the local spool, then replays the spool to
+        the server. Anything the server doesn't acknowledge stays in the spool
+        and is retried every SPOOL_RETRY_INTERVAL seconds.
+        """
+        spool = EventSpool(os.path.join(CACHE_DIR, f"spool_{self.dcc_name}.db"))
+        # Events left over from an earlier run are sent as soon as possible.
+        self._replay_spool(spool)
+        while True:
+            try:
+                timeout = SPOOL_RETRY_INTERVAL if self.transport_counters["spooled"] else None
+                items = [self.send_queue.get(timeout=timeout)]
+            except queue.Empty:
+                self._replay_spool(spool)
+                continue
+
+            # Journal everything already waiting in one transaction.
+            while True:
+                try:
+                    items.append(self.send_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                queued = [item for item in items if item is not None]
+                spool.append([(session.owner if session else None, event) for events, session in queued for event in events])
+                for events, session in queued:
+                    if events[0]["type"] == "heartbeat":
+                        session.heartbeat_queued = False
+                self._replay_spool(spool)
+            except Exception as e:
+                print(f"Time tracker sender error: {e}")
+            finally:
+                for _ in items:
+                    self.send_queue.task_done()
+            if None in items:
+                spool.close()
+                return
+
+    def _replay_spool(self, spool):
+        """Sends the spool to /api/session/sync in batches until it is empty or the server is unreachable."""
+        if self.auth is None:
+            # Not logged in yet (restore_login/login may still be running); without a token it would only get a 401.
+            self.transport_counters["spooled"] = spool.count()
+            return
+        if self.offline and time.time() < self.next_replay_time:
+            # Keep journaling while offline, but only retry every SPOOL_RETRY_INTERVAL.
+            self.transport_counters["spooled"] = spool.count(self.auth["user_id"])
+            return
+        self._refresh_token_if_due()
+        # The whole replay uses one token, and other users' rows (from another
+        # DCC on this machine) wait for their own.
+        auth = self.auth
+        owner = auth["user_id"]
+        while True:
+            batch = spool.peek(SPOOL_BATCH_SIZE, owner)
+            if not batch:
+                break
+            last_seq = batch[-1][0]
+            lifecycle = [event for _, event in batch if event["type"] != "activity"]
+            activity = [event for _, event in batch if event["type"] == "activity"]
+
+            # Lifecycle events go first so the server knows every session the activity refers to.
+            outcome, data = "ok", {}
+            if lifecycle:
+                outcome, data = self._post_events("/api/session/sync", lifecycle, auth)
+            if outcome == "ok" and activity:
+                outcome, _ = self._post_events("/api/session/events", activity, auth)
+            if outcome == "retry":
+                break
+            if outcome == "rejected":
+                # Retrying a batch the server refuses would block the spool forever.
+                self.transport_counters["dropped"] += len(batch)
+                spool.remove_through(last_seq, owner)
+                continue
+
+            for session_key, server_id in data.get("sessions", {}).items():
+                session = self.sessions_by_key.get(session_key)
+                if session is not None and session.server_id is None:
+                    session.server_id = server_id
+                    print(f"Time tracker session started. ID: {server_id}")
+            spool.remove_through(last_seq, owner)
+            self.transport_counters["sent"] += len(batch)
+            if self.offline:
+                print(f"Server reachable again. Replayed {len(batch)} tracking events.")
+                self.offline = False
+        self.transport_counters["spooled"] = spool.count(owner)
+
+    def _post_events(self, path, events, auth_sent):
+        """
+        Posts a batch of spooled events with the token in auth_sent. Returns ("ok", response data),
+        ("retry", None) if the server is unreachable or failing, or
+        ("rejected", None) if it refused the batch.
+        """
+        try:
+            response = requests.post(f"{SERVER_URL}{path}", json={"events": events}, headers=self._auth_headers(auth_sent), timeout=10)
+        except requests.exceptions.RequestException:
+            response = None
+        if response is not None and response.status_code == 401:
+            # Keep the events spooled until the artist logs in again. Only forget the
+            # token that was refused; a login may have replaced it in the meantime.
+            if self.auth is auth_sent:
+                print("Login token expired or rejected. Log in again to send tracked time.")
+                self.auth = None
+                self._update_token_cache(None)
+            self.offline = True
+            self.next_replay_time = time.time() + SPOOL_RETRY_INTERVAL
+            return "retry", None
+        if response is None or response.status_code >= 500:
+            self.transport_counters["failed"] += 1
+            if not self.offline:
+                print("Server unreachable. Tracking events will be saved locally and sent later.")
+                self.offline = True
+            self.next_replay_time = time.time() + SPOOL_RETRY_INTERVAL
+            return "retry", None
+        if response.status_code != 200:
+            print(f"Server rejected {len(events)} tracking events: {response.status_code}")
+            return "rejected", None
+        return "ok", response.json()
+
+    def _background_worker(self):
+        """The main loop for the background thread."""
+        while not self.stop_event.is_set():
+            if self.session:
+                # Check for idleness
+                if not self.is_paused and (time.time() - self.last_active_time > IDLE_TIMEOUT):
+                    self._pause_session()
+                
+                # The heartbeat is sent manually by the DCC app,
+                # this thread is just for checking idleness.
+
+                # Don't let a quiet session hold activity events forever
+                if self.activity_buffer and time.time() - self.activity_buffer_started >= ACTIVITY_FLUSH_INTERVAL:
+                    self.flush_activity()
+            
+            self.stop_event.wait(HEARTBEAT_INTERVAL)
+
+    def _start_background_thread(self):
+        """Starts the background thread for heartbeats and idle checks."""
+        if self.heartbeat_thread is None or not self.heartbeat_thread.is_alive():
+            self.stop_event.clear()
+            self.last_active_time = time.time()
+            self.is_paused = False
+            self.heartbeat_thread = threading.Thread(target=self._background_worker, daemon=True)
+            self.heartbeat_thread.start()
+            print("Idle detection thread started.")
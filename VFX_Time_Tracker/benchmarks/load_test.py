@@ -0,0 +1,281 @@
+import os
+import sys
+import time
+import json
+import random
+import socket
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import requests
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER_DIR = os.path.join(ROOT_DIR, "server")
+sys.path.insert(0, os.path.join(ROOT_DIR, "vfx_tracker_addon"))
+import dcc_client
+from dcc_client import DCCClient
+
+BENCH_PASSWORD = "bench"
+
+class LatencyRecorder:
+    """Collects per-endpoint latencies and failures from every simulated client."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = 0
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def record_lock_error(self):
+        with self.lock:
+            self.lock_errors += 1
+
+    def report(self, elapsed):
+        rows = []
+        with self.lock:
+            for endpoint in sorted(self.latencies):
+                samples = sorted(self.latencies[endpoint])
+                rows.append({
+                    "endpoint": endpoint,
+                    "requests": len(samples),
+                    "errors": self.errors[endpoint],
+                    "req_per_s": round(len(samples) / elapsed, 1),
+                    "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                    "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                    "p99_ms": round(percentile(samples, 99) * 1000, 1),
+                    "max_ms": round(samples[-1] * 1000, 1),
+                })
+        return rows
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+class TimedRequests:
+    """
+    Stands in for the `requests` module inside dcc_client, so every call the
+    real DCCClient makes is timed without changing the client itself.
+    """
+    exceptions = requests.exceptions
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.http = requests.Session()
+        self.http.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=64))
+
+    def get(self, url, **kwargs):
+        return self._timed("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._timed("POST", url, **kwargs)
+
+    def _timed(self, method, url, **kwargs):
+        endpoint = urlsplit(url).path
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.recorder.record(endpoint, time.perf_counter() - started, False)
+            raise
+        self.recorder.record(endpoint, time.perf_counter() - started, response.status_code < 500)
+        return response
+
+def log_in_artists(args):
+    """
+    Registers and logs in every simulated artist before the timed run starts.
+    Password hashing is deliberately slow, so this runs with bounded
+    concurrency and is reported separately from the steady-state numbers.
+    """
+    setup_recorder = LatencyRecorder()
+    dcc_client.requests = TimedRequests(setup_recorder)
+    started = time.time()
+    usernames = [f"artist_{i % args.users + 1:04d}" for i in range(args.clients)]
+
+    def register(username):
+        requests.post(f"{dcc_client.SERVER_URL}/api/register", json={"username": username, "password": BENCH_PASSWORD}, timeout=60)
+
+    def log_in(index):
+        client = DCCClient(f"Bench{index:04d}")
+        if client.login(usernames[index], BENCH_PASSWORD):
+            return client
+        client.close()
+        return None
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(register, sorted(set(usernames))))
+        clients = [client for client in pool.map(log_in, range(args.clients)) if client is not None]
+    elapsed = time.time() - started
+    for row in setup_recorder.report(elapsed):
+        if row["endpoint"] == "/api/login":
+            print(f"Logged in {len(clients)}/{args.clients} artists in {elapsed:.1f}s "
+                  f"(login p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms).")
+    return clients
+
+def simulate_artist(client, index, args, stop_at, rng):
+    """
+    One logged-in artist: starts a session, heartbeats while working, goes idle
+    now and then (pause/resume), saves the scene, and stops at the end of the run.
+    """
+    tasks = client.get_tasks() or [{"id": None}]
+
+    # Stagger starts so the clients don't heartbeat in lockstep.
+    time.sleep(rng.random() * args.heartbeat_interval)
+    while time.time() < stop_at:
+        client.start_session(f"BENCH_{index % 20:02d}", f"shot_{index:04d}.ma", rng.choice(tasks)["id"])
+        session_end = min(stop_at, time.time() + rng.uniform(0.5, 1.5) * args.session_length)
+        while time.time() < session_end:
+            if client.is_paused:
+                if rng.random() < 0.5:
+                    client.send_heartbeat()  # back at the desk; resumes the session
+            elif rng.random() < args.idle_chance:
+                client._pause_session()
+            else:
+                client.send_heartbeat()
+                if rng.random() < args.save_chance:
+                    client.log_event("scene_save", {"file": f"shot_{index:04d}.ma"})
+            time.sleep(args.heartbeat_interval * rng.uniform(0.8, 1.2))
+        client.stop_session()
+    client.flush(timeout=30)
+    client.close()
+
+def simulate_viewer(args, stop_at, recorder, rng):
+    """A manager with the dashboard open, plus artists reviewing their logs."""
+    http = TimedRequests(recorder)
+    url = dcc_client.SERVER_URL
+    today = date.today()
+    while time.time() < stop_at:
+        span = rng.choice([7, 30, 90, 365])
+        start = (today - timedelta(days=span)).isoformat()
+        try:
+            http.get(f"{url}/api/dashboard_stats", params={"start_date": start, "end_date": today.isoformat()}, timeout=60)
+            day = (today - timedelta(days=rng.randint(1, 90))).isoformat()
+            http.get(f"{url}/api/get_logs", params={"user_id": rng.randint(1, args.users), "date": day}, timeout=60)
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(args.viewer_interval * rng.uniform(0.5, 1.5))
+
+def start_in_process_server(args, recorder, workdir):
+    """
+    Serves server.app from this process on a free localhost port, against a
+    copy of --db (or a fresh database), and counts SQLite lock errors.
+    """
+    sys.path.insert(0, SERVER_DIR)
+    import server
+    import run
+    from flask import got_request_exception
+    from werkzeug.serving import make_server
+
+    db_path = os.path.join(workdir, "server_time_logs.db")
+    if args.db:
+        print(f"Copying '{args.db}' for the benchmark...")
+        shutil.copy(args.db, db_path)
+    server.DATABASE = run.DATABASE = db_path
+    server.TOKEN_SECRET_FILE = os.path.join(workdir, "token_secret.key")
+    run.SCHEMA = os.path.join(SERVER_DIR, "schema.sql")
+    run.initialize_database()
+    run.migrate_database()
+
+    def on_exception(sender, exception, **extra):
+        if isinstance(exception, sqlite3.OperationalError) and ("locked" in str(exception) or "busy" in str(exception)):
+            recorder.record_lock_error()
+    got_request_exception.connect(on_exception, server.app, weak=False)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no per-request access log
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    httpd = make_server("127.0.0.1", port, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    server.start_session_reaper()
+    return httpd, f"http://127.0.0.1:{port}"
+
+def print_report(rows, elapsed, recorder, clients, in_process):
+    print()
+    print(f"{'endpoint':<28}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for row in rows:
+        print(f"{row['endpoint']:<28}{row['requests']:>10}{row['errors']:>8}{row['req_per_s']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+    total = sum(row["requests"] for row in rows)
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s) from {clients} simulated artists.")
+    if in_process:
+        print(f"SQLite lock/busy errors: {recorder.lock_errors}")
+    else:
+        print("SQLite lock errors are only counted with --in-process; server errors show up in the errors column.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates a studio of DCC clients against a tracker server.")
+    parser.add_argument("--clients", type=int, default=50, help="simulated artists, each a real DCCClient")
+    parser.add_argument("--viewers", type=int, default=0, help="threads polling dashboard_stats and get_logs")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run")
+    parser.add_argument("--heartbeat-interval", type=float, default=dcc_client.HEARTBEAT_INTERVAL,
+                        help="seconds between heartbeats per artist; lower it to compress time")
+    parser.add_argument("--session-length", type=float, default=600, help="average seconds before a session is stopped")
+    parser.add_argument("--idle-chance", type=float, default=0.05, help="chance per tick that an artist goes idle")
+    parser.add_argument("--save-chance", type=float, default=0.1, help="chance per tick of a scene save event")
+    parser.add_argument("--viewer-interval", type=float, default=5, help="seconds between dashboard refreshes")
+    parser.add_argument("--users", type=int, default=150, help="artist accounts to spread clients over")
+    parser.add_argument("--url", default=dcc_client.SERVER_URL, help="server to test, unless --in-process")
+    parser.add_argument("--in-process", action="store_true", help="start the server in this process on a free port")
+    parser.add_argument("--db", help="with --in-process, benchmark a copy of this database (e.g. from seed_data.py)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    workdir = tempfile.mkdtemp(prefix="vfx_tracker_bench_")
+    httpd = None
+    if args.in_process:
+        httpd, dcc_client.SERVER_URL = start_in_process_server(args, recorder, workdir)
+    else:
+        dcc_client.SERVER_URL = args.url.rstrip("/")
+    # Keep the simulated clients' spools, caches and login tokens away from the real ones.
+    dcc_client.CACHE_DIR = os.path.join(workdir, "client")
+    dcc_client.METADATA_CACHE_FILE = os.path.join(dcc_client.CACHE_DIR, "metadata_cache.json")
+    dcc_client.TOKEN_CACHE_FILE = os.path.join(dcc_client.CACHE_DIR, "auth_token.json")
+
+    print(f"Benchmarking {dcc_client.SERVER_URL} with {args.clients} artists and {args.viewers} viewers for {args.duration:.0f}s...")
+    clients = log_in_artists(args)
+    dcc_client.requests = TimedRequests(recorder)
+    rng = random.Random(args.seed)
+    started = time.time()
+    stop_at = started + args.duration
+    threads = [threading.Thread(target=simulate_artist, args=(client, i, args, stop_at, random.Random(rng.random())), daemon=True)
+               for i, client in enumerate(clients)]
+    threads += [threading.Thread(target=simulate_viewer, args=(args, stop_at, recorder, random.Random(rng.random())), daemon=True)
+                for _ in range(args.viewers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    rows = recorder.report(elapsed)
+    print_report(rows, elapsed, recorder, len(clients), args.in_process)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"elapsed": elapsed, "clients": args.clients, "viewers": args.viewers,
+                       "lock_errors": recorder.lock_errors, "endpoints": rows}, f, indent=2)
+
+    if httpd is not None:
+        httpd.shutdown()
+        import server
+        server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
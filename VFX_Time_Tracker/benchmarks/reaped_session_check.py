@@ -0,0 +1,100 @@
+import os
+import sys
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIR)
+import server
+
+HEARTBEAT_STEP = timedelta(minutes=10)
+
+class Replay:
+    """Plays one DCC session into /api/session/sync, one request per event, as a reconnecting client does."""
+    def __init__(self, client, headers, session_key, start):
+        self.client, self.headers, self.session_key = client, headers, session_key
+        self.count = 0
+        self.send("start", start, dcc_name="Maya")
+
+    def send(self, event_type, at, **fields):
+        self.count += 1
+        event = dict(fields, key=f"{self.session_key}-{self.count}", session_key=self.session_key,
+                     type=event_type, timestamp=at.isoformat())
+        response = self.client.post("/api/session/sync", json={"events": [event]}, headers=self.headers)
+        assert response.status_code == 200, response.get_json()
+
+    def work(self, start, end):
+        """Heartbeats every HEARTBEAT_STEP from start through end."""
+        at = start
+        while at <= end:
+            self.send("heartbeat", at)
+            at += HEARTBEAT_STEP
+
+def reap_at(now):
+    # Heartbeats sent so far are buffered; the reaper flushes them before it looks.
+    server.reap_stale_sessions(now=now)
+
+def overnight_pause(replay, t0):
+    """9h of work, paused overnight and reaped, resumed 15h later for 8h more."""
+    replay.work(t0, t0 + timedelta(hours=9))
+    replay.send("pause", t0 + timedelta(hours=9))
+    reap_at(t0 + timedelta(hours=22))
+    replay.send("resume", t0 + timedelta(hours=24))
+    replay.work(t0 + timedelta(hours=24), t0 + timedelta(hours=32))
+    replay.send("stop", t0 + timedelta(hours=32))
+    return 17 * 60
+
+def laptop_sleep(replay, t0):
+    """2h of work, the laptop sleeps with the session active and is reaped, then 1h more."""
+    replay.work(t0, t0 + timedelta(hours=2))
+    reap_at(t0 + timedelta(hours=3))
+    replay.work(t0 + timedelta(hours=10), t0 + timedelta(hours=11))
+    replay.send("stop", t0 + timedelta(hours=11))
+    return 3 * 60
+
+def offline_client(replay, t0):
+    """Reaped after 1h while the client is offline; its spooled heartbeats then carry on to 2h."""
+    replay.work(t0, t0 + timedelta(hours=1))
+    reap_at(t0 + timedelta(hours=1, minutes=40))
+    replay.work(t0 + timedelta(hours=1, minutes=10), t0 + timedelta(hours=2))
+    replay.send("stop", t0 + timedelta(hours=2))
+    return 2 * 60
+
+SCENARIOS = (overnight_pause, laptop_sleep, offline_client)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks that sessions closed by the stale session reaper keep exactly the time worked "
+                    "when the client's late events arrive, one sync request at a time.")
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        server.DATABASE = os.path.join(directory, "reaped_check.db")
+        with open(os.path.join(SERVER_DIR, "schema.sql")) as f, sqlite3.connect(server.DATABASE) as conn:
+            conn.executescript(f.read())
+        client = server.app.test_client()
+        t0 = datetime.utcnow() - timedelta(days=3)
+        failures = 0
+        for number, scenario in enumerate(SCENARIOS):
+            conn = server.get_db()
+            with conn:
+                user_id = conn.execute("INSERT INTO users (username, password_hash) VALUES (?, 'x')",
+                                       (scenario.__name__,)).lastrowid
+            headers = {"Authorization": f"Bearer {server.issue_token(user_id)[0]}"}
+            expected = scenario(Replay(client, headers, f"check-{number}", t0), t0)
+
+            sessions = conn.execute("SELECT COUNT(*), SUM(duration) FROM sessions WHERE user_id = ? AND status = 'stopped'",
+                                    (user_id,)).fetchone()
+            rollup = conn.execute("SELECT SUM(total_duration) FROM daily_rollups WHERE user_id = ?", (user_id,)).fetchone()[0]
+            conn.close()
+            ok = abs(sessions[1] - expected) < 1 and abs(rollup - sessions[1]) < 0.01
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {scenario.__name__:<16} expected {expected} min, "
+                  f"stored {sessions[1]:.1f} min in {sessions[0]} session(s), rollup {rollup:.1f} min")
+        server.shutdown()
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIR)
+import server
+
+ENCODINGS = ("identity", "gzip", "br")
+LAYOUTS = ("records", "columnar")
+
+def measure(client, url, encoding, repeat):
+    """Returns (bytes on the wire, median seconds) for one response variant."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        times.append(time.perf_counter() - started)
+    if response.status_code != 200:
+        print(f"ERROR: {url} returned {response.status_code}")
+        sys.exit(1)
+    return len(response.data), sorted(times)[len(times) // 2]
+
+def encode_time(stats, repeat):
+    """Median seconds to encode the stats payload alone, without the queries."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        server.app.json.dumps({"status": "success", "stats": stats})
+        times.append(time.perf_counter() - started)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compares the size and time of large dashboard responses per encoder, compression and layout.")
+    parser.add_argument("--db", required=True, help="database to read, e.g. one made by seed_data.py")
+    parser.add_argument("--days", type=int, default=30, help="dashboard range, ending today")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    server.DATABASE = args.db
+    client = server.app.test_client()
+    start = (date.today() - timedelta(days=args.days)).isoformat()
+    base_url = f"/api/dashboard_stats?include_export=1&start_date={start}&end_date={date.today().isoformat()}"
+
+    stats = client.get(base_url).get_json()["stats"]
+    fast_encoder = server.orjson
+    encoders = [("orjson", fast_encoder), ("stdlib", None)] if fast_encoder else [("stdlib", None)]
+    print(f"dashboard_stats with export rows for the last {args.days} days of '{args.db}' "
+          f"({len(stats['all_sessions_for_export']):,} sessions):")
+    for encoder_name, encoder in encoders:
+        server.orjson = encoder
+        print(f"{encoder_name}: encoding alone takes {encode_time(stats, args.repeat) * 1000:.1f} ms")
+        for layout in LAYOUTS:
+            url = base_url + ("&layout=columnar" if layout == "columnar" else "")
+            for encoding in ENCODINGS:
+                if encoding == "br" and server.brotli is None:
+                    continue
+                size, seconds = measure(client, url, encoding, args.repeat)
+                print(f"  {layout:<10}{encoding:<10}{size:>12,} bytes{seconds * 1000:>9.1f} ms per request")
+    server.orjson = fast_encoder
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import date, timedelta
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIR)
+from server import rebuild_daily_rollups
+from werkzeug.security import generate_password_hash
+
+# Config
+SCHEMA = os.path.join(SERVER_DIR, "schema.sql")
+BENCH_PASSWORD = "bench"  # every seeded artist can log in with this
+APPS = ["Maya", "Blender", "Nuke", "Houdini"]
+APP_WEIGHTS = [45, 30, 15, 10]
+EVENT_TYPES = ["scene_save", "render", "undo", "redo"]
+CHUNK_SIZE = 50000  # rows per executemany
+
+def create_database(path):
+    """Creates a fresh database from schema.sql. Refuses to touch an existing file."""
+    if os.path.exists(path):
+        print(f"ERROR: '{path}' already exists. Seed into a new file so real data is never mixed with synthetic data.")
+        sys.exit(1)
+    conn = sqlite3.connect(path)
+    with open(SCHEMA, 'r') as f:
+        conn.executescript(f.read())
+    conn.commit()
+    return conn
+
+def seed_users(conn, count):
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    with conn:
+        conn.executemany("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                         [(f"artist_{i:04d}", password_hash) for i in range(1, count + 1)])
+    return [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id")]
+
+def generate_sessions(rng, total, user_ids, task_ids, days):
+    """
+    Yields stopped session rows spread over the last `days` days.
+    Work happens on weekdays between 08:00 and 22:00, and session lengths are
+    skewed towards short sessions with a long tail, like real DCC usage.
+    """
+    today = date.today()
+    workdays = [today - timedelta(days=offset) for offset in range(1, days + 1)]
+    workdays = [day for day in workdays if day.weekday() < 5] or [today - timedelta(days=1)]
+    for _ in range(total):
+        day = rng.choice(workdays)
+        start_seconds = rng.randint(8 * 3600, 20 * 3600)
+        total_minutes = min(rng.lognormvariate(3.6, 0.9), 600)
+        paused_minutes = total_minutes * rng.random() * 0.3 if rng.random() < 0.4 else 0
+        end_seconds = start_seconds + int(total_minutes * 60)
+        start = f"{day.isoformat()} {start_seconds // 3600:02d}:{start_seconds // 60 % 60:02d}:{start_seconds % 60:02d}.000000"
+        end_day = day + timedelta(days=end_seconds // 86400)
+        end_seconds %= 86400
+        end = f"{end_day.isoformat()} {end_seconds // 3600:02d}:{end_seconds // 60 % 60:02d}:{end_seconds % 60:02d}.000000"
+        app_name = rng.choices(APPS, APP_WEIGHTS)[0]
+        task_id = rng.choice(task_ids) if rng.random() < 0.9 else None
+        yield (rng.choice(user_ids), task_id, app_name, f"shot_{rng.randint(1, 400):03d}", start, day.isoformat(),
+               end, end, round(total_minutes - paused_minutes, 2), round(paused_minutes, 2))
+
+def seed_sessions(conn, rows):
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            inserted += insert_sessions(conn, batch)
+            batch = []
+            print(f"  {inserted:,} sessions...")
+    if batch:
+        inserted += insert_sessions(conn, batch)
+    return inserted
+
+def insert_sessions(conn, batch):
+    with conn:
+        conn.executemany("""
+            INSERT INTO sessions (user_id, task_id, app_name, session_name, start_time, start_day,
+                                  end_time, last_heartbeat, duration, paused_duration, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'stopped')
+        """, batch)
+    return len(batch)
+
+def seed_activity_events(conn, rng, per_session):
+    """Adds `per_session` activity events, on average, to every session, timed within the session."""
+    inserted = 0
+    batch = []
+    for session_id, start_time, duration in conn.execute("SELECT id, start_time, duration FROM sessions").fetchall():
+        for _ in range(rng.randint(0, per_session * 2)):
+            offset = rng.random() * (duration or 0)
+            batch.append((session_id, f"+{offset:.3f} minutes", start_time, rng.choice(EVENT_TYPES)))
+        if len(batch) >= CHUNK_SIZE:
+            inserted += insert_activity_events(conn, batch)
+            batch = []
+    if batch:
+        inserted += insert_activity_events(conn, batch)
+    return inserted
+
+def insert_activity_events(conn, batch):
+    with conn:
+        conn.executemany("""
+            INSERT INTO activity_events (session_id, timestamp, event_type)
+            VALUES (?, strftime('%Y-%m-%d %H:%M:%f', ?, ?), ?)
+        """, [(session_id, start_time, offset, event_type) for session_id, offset, start_time, event_type in batch])
+    return len(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeds a database with synthetic history for benchmarking.")
+    parser.add_argument("--db", default="bench_time_logs.db", help="database file to create (must not exist)")
+    parser.add_argument("--sessions", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=150)
+    parser.add_argument("--days", type=int, default=365, help="spread sessions over this many past days")
+    parser.add_argument("--events-per-session", type=int, default=0, help="average activity events per session")
+    parser.add_argument("--seed", type=int, default=42, help="random seed, so runs are reproducible")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    conn = create_database(args.db)
+    # Bulk load: the file is new, so a crash mid-seed just means seeding again.
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    user_ids = seed_users(conn, args.users)
+    task_ids = [row[0] for row in conn.execute("SELECT id FROM tasks")]
+    print(f"Seeding {args.sessions:,} sessions for {len(user_ids)} artists over {args.days} days into '{args.db}'...")
+    sessions = seed_sessions(conn, generate_sessions(rng, args.sessions, user_ids, task_ids, args.days))
+    events = seed_activity_events(conn, rng, args.events_per_session) if args.events_per_session else 0
+
+    print("Building daily rollups...")
+    rebuild_daily_rollups(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"Seeded {sessions:,} sessions and {events:,} activity events in {time.perf_counter() - started:.1f}s.")
+    print(f"Artists log in as artist_0001..artist_{args.users:04d} with password '{BENCH_PASSWORD}'.")
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,100 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
+import sys
+import math
+import queue
+import importlib
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkcalendar import Calendar
-import requests
-from datetime import datetime
-import pandas as pd
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
 import sv_ttk  
 
 # Server Config
 SERVER_URL = "http://127.0.0.1:5000"
 MODERN_COLORS = ['#5B9BD5', '#ED7D31', '#A5A5A5', '#FFC000', '#4472C4', '#70AD47', '#255E91', '#9E480E']
+LOG_CACHE_SIZE = 90  # days of logs kept in memory
+FETCH_WORKERS = 2
+RESULT_POLL_INTERVAL = 50  # ms between checks for finished fetches
+PIE_START_ANGLE = 90
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+
+# Startup
+# Only tkinter and the theme load before the login screen. requests and
+# tkcalendar are preloaded in the background while the artist types, and
+# matplotlib loads the first time the Reports tab is shown.
+# Run with --startup-timing to print the time to the login screen and the cost
+# of each deferred import (python -X importtime main.py gives the full tree).
+PRELOAD_MODULES = ("requests", "tkcalendar")
+DEFERRED_IMPORTS = ("requests", "tkcalendar", "matplotlib.style", "matplotlib.figure", "matplotlib.backends.backend_tkagg")
+STARTUP_IMPORTS_DONE = time.perf_counter()
+import_times = {}  # module name -> seconds it took to import
+
+def lazy_import(name):
+    """Imports a module on first use and records how long the first import took."""
+    already_loaded = name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_loaded:
+        import_times.setdefault(name, time.perf_counter() - started)
+    return module
+
+def preload_modules():
+    """Runs on a background thread while the login screen is up. Imports only, no Tk calls."""
+    for name in PRELOAD_MODULES:
+        try:
+            lazy_import(name)
+        except ImportError:
+            pass  # Reported properly when the module is actually used
+
+def total_by(logs, field):
+    """Sums session minutes per value of `field` (task_name, app_name), sorted by name."""
+    totals = {}
+    for log in logs:
+        key = log.get(field) or 'N/A'
+        totals[key] = totals.get(key, 0) + (log.get('duration') or 0)
+    return dict(sorted(totals.items()))
+
+class LogCache:
+    """
+    LRU cache of per-day logs. Days before today are closed, so their
+    cached logs are final. Today's entry is shown immediately but always
+    refetched. Only used from the Tk main thread.
+    """
+    def __init__(self, max_size=LOG_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get(self, day):
+        logs = self.entries.get(day)
+        if logs is not None:
+            self.entries.move_to_end(day)
+        return logs
+
+    def put(self, day, logs):
+        self.entries[day] = logs
+        self.entries.move_to_end(day)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def is_final(self, day):
+        return day in self.entries and day < date.today().isoformat()
+
+def days_between(start, end):
+    """ISO dates from start to end inclusive."""
+    day = start
+    while day <= end:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+def month_bounds(year, month):
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first, next_month - timedelta(days=1)
 
 class TimeTrackerApp:
     def __init__(self, root):
@@ -20,6 +103,16 @@ class TimeTrackerApp:
         self.root.geometry("1400x850")
         self.user_info = None
 
+        # Network calls run on worker threads. Their results come back through
+        # a queue that the Tk main thread polls, since Tk isn't thread-safe.
+        self.http = None  # requests.Session, created on first use
+        self.fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        self.fetch_results = queue.Queue()
+        self.log_cache = LogCache()
+        self.pending_fetches = set()
+        self.selected_date = None
+        self.redraw_timing = False  # --redraw-timing prints how long each Reports redraw takes
+
         # Theme
         sv_ttk.set_theme("light") 
         self.style = ttk.Style()
@@ -82,6 +175,7 @@ class TimeTrackerApp:
             if password != confirm:
                 messagebox.showerror("Error", "Passwords do not match.", parent=register_window)
                 return
+            requests = lazy_import("requests")
             try:
                 response = requests.post(f"{SERVER_URL}/api/register", json={"username": username, "password": password})
                 if response.status_code == 201:
@@ -99,6 +193,7 @@ class TimeTrackerApp:
         if not username or not password:
             messagebox.showerror("Error", "Username and password are required.")
             return
+        requests = lazy_import("requests")
         try:
             response = requests.post(f"{SERVER_URL}/api/login", json={"username": username, "password": password})
             if response.status_code == 200:
@@ -118,11 +213,15 @@ class TimeTrackerApp:
         left_panel = ttk.Frame(main_frame, width=350)
         left_panel.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
         ttk.Label(left_panel, text=f"Welcome, {self.user_info['username']}", style="Header.TLabel").pack(pady=10)
+        Calendar = lazy_import("tkcalendar").Calendar
         self.cal = Calendar(left_panel, selectmode='day', date_pattern='yyyy-mm-dd', font="Helvetica 12")
         self.cal.pack(pady=10, fill="x")
+        self.cal.tag_config('worked', background=MODERN_COLORS[0], foreground='white')
+        self.worked_day_events = {}  # ISO day -> calevent id
 
         right_panel = ttk.Notebook(main_frame)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        self.notebook = right_panel
 
         self.logs_tab = ttk.Frame(right_panel, padding="10")
         right_panel.add(self.logs_tab, text='Daily Logs')
@@ -133,6 +232,9 @@ class TimeTrackerApp:
         self.create_reports_tab_content()
         
         self.cal.bind("<<CalendarSelected>>", self.on_date_select)
+        self.cal.bind("<<CalendarMonthChanged>>", self.on_month_changed)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_month_changed(None)
         self.on_date_select(None)
 
     def create_logs_tab_content(self):
@@ -162,35 +264,230 @@ class TimeTrackerApp:
         ttk.Button(bottom_frame, text="Launch Manager Dashboard", command=self.launch_dashboard).pack(side=tk.RIGHT)
 
     def create_reports_tab_content(self):
-        ttk.Label(self.reports_tab, text="Performance on Selected Day", style="Header.TLabel").pack(pady=10)
-        charts_frame = ttk.Frame(self.reports_tab)
-        charts_frame.pack(fill=tk.BOTH, expand=True)
+        self.report_title = ttk.Label(self.reports_tab, text="Performance on Selected Day", style="Header.TLabel")
+        self.report_title.pack(pady=10)
+        period_frame = ttk.Frame(self.reports_tab)
+        period_frame.pack()
+        self.report_period = tk.StringVar(value="Day")
+        for period in ("Day", "Week", "Month"):
+            ttk.Radiobutton(period_frame, text=period, value=period, variable=self.report_period,
+                            command=self.refresh_reports).pack(side=tk.LEFT, padx=10)
+        self.charts_frame = ttk.Frame(self.reports_tab)
+        self.charts_frame.pack(fill=tk.BOTH, expand=True)
+        self.charts_ready = False
+
+    def create_charts(self):
+        """Builds the report figures. matplotlib is imported here, the first time the tab is shown."""
+        lazy_import("matplotlib.style").use('seaborn-v0_8-whitegrid')
+        Figure = lazy_import("matplotlib.figure").Figure
+        FigureCanvasTkAgg = lazy_import("matplotlib.backends.backend_tkagg").FigureCanvasTkAgg
 
         self.task_fig = Figure(figsize=(5, 4), dpi=100)
         self.task_ax = self.task_fig.add_subplot(111)
-        self.task_canvas = FigureCanvasTkAgg(self.task_fig, master=charts_frame)
+        self.task_canvas = FigureCanvasTkAgg(self.task_fig, master=self.charts_frame)
         self.task_canvas.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
 
         self.app_fig = Figure(figsize=(5, 4), dpi=100)
         self.app_ax = self.app_fig.add_subplot(111)
-        self.app_canvas = FigureCanvasTkAgg(self.app_fig, master=charts_frame)
+        self.app_canvas = FigureCanvasTkAgg(self.app_fig, master=self.charts_frame)
         self.app_canvas.get_tk_widget().pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5)
 
+        # Chart artists are kept between redraws and only rebuilt when the
+        # set of tasks/apps changes; otherwise their data is updated in place.
+        self.task_summary = self.app_summary = None
+        self.task_labels = None
+        self.task_wedges, self.task_label_texts, self.task_pct_texts = [], [], []
+        self.app_labels = None
+        self.app_bars = []
+        self.shown_report_logs = None
+        self.redraw_started = None
+        self.redraw_relaid = False
+        self.pending_chart_draws = 0
+        self.task_canvas.mpl_connect('draw_event', self.on_chart_drawn)
+        self.app_canvas.mpl_connect('draw_event', self.on_chart_drawn)
+        self.charts_ready = True
+
+    def reports_visible(self):
+        return self.notebook.select() == str(self.reports_tab)
+
+    def on_tab_changed(self, event):
+        if not self.reports_visible():
+            return
+        if not self.charts_ready:
+            self.create_charts()
+        # Reports are only drawn while the tab is visible, so catch up now
+        self.refresh_reports()
+
     def on_date_select(self, event):
         self.fetch_and_update_all(self.cal.get_date())
 
-    def fetch_and_update_all(self, date):
+    def on_month_changed(self, event):
+        """Loads the displayed month in one request and marks the days worked."""
+        month, year = self.cal.get_displayed_month()
+        start, end = month_bounds(year, month)
+        end = min(end, date.today())
+        if start > end:
+            return
+        days = list(days_between(start, end))
+        if not all(self.log_cache.is_final(day) for day in days):
+            self.request_range(start.isoformat(), end.isoformat())
+
+    def fetch_and_update_all(self, day):
+        """
+        Shows a day's logs. Cached days render immediately. Anything not final
+        is fetched in the background, and the neighbouring days are prefetched.
+        """
+        self.selected_date = day
+        logs = self.log_cache.get(day)
+        if logs is not None:
+            self.update_logs_tab(logs)
+        else:
+            self.total_time_label.config(text="Loading...")
+        if not self.log_cache.is_final(day) and not self.range_pending_for(day):
+            self.request_logs(day)
+        self.prefetch_around(day)
+        self.refresh_reports()
+
+    def prefetch_around(self, day):
+        selected = date.fromisoformat(day)
+        for neighbour in (selected - timedelta(days=1), selected + timedelta(days=1)):
+            neighbour = neighbour.isoformat()
+            if (neighbour <= date.today().isoformat() and self.log_cache.get(neighbour) is None
+                    and not self.range_pending_for(neighbour)):
+                self.request_logs(neighbour)
+
+    def range_pending_for(self, day):
+        """True if a range fetch that covers `day` is already running."""
+        return any(isinstance(key, tuple) and key[0] <= day <= key[1] for key in self.pending_fetches)
+
+    def request_logs(self, day):
+        """Starts a background fetch for a day unless one is already running."""
+        self.start_fetch(day, self.fetch_logs, self.user_info['id'], day)
+
+    def request_range(self, start, end):
+        """Starts a background fetch of every day from start to end (ISO dates) in one request."""
+        self.start_fetch((start, end), self.fetch_range, self.user_info['id'], start, end)
+
+    def start_fetch(self, key, worker, *args):
+        if key in self.pending_fetches:
+            return
+        self.pending_fetches.add(key)
+        if len(self.pending_fetches) == 1:
+            self.root.after(RESULT_POLL_INTERVAL, self.process_fetch_results)
+        self.fetch_pool.submit(worker, *args)
+
+    def fetch_logs(self, user_id, day):
+        """Runs on a worker thread. Never touches Tk."""
+        self.fetch_json(day, "/api/get_logs", {"user_id": user_id, "date": day})
+
+    def fetch_range(self, user_id, start, end):
+        """Runs on a worker thread. Never touches Tk."""
+        self.fetch_json((start, end), "/api/get_logs_range", {"user_id": user_id, "start_date": start, "end_date": end})
+
+    def fetch_json(self, key, path, params):
+        requests = lazy_import("requests")
+        if self.http is None:
+            self.http = requests.Session()
         try:
-            params = {"user_id": self.user_info['id'], "date": date}
-            response = requests.get(f"{SERVER_URL}/api/get_logs", params=params)
+            response = self.http.get(f"{SERVER_URL}{path}", params=params, timeout=10)
             if response.status_code == 200:
-                logs = response.json().get("logs", [])
-                self.update_logs_tab(logs)
-                self.update_reports_tab(logs)
+                self.fetch_results.put((key, response.json(), None))
             else:
-                messagebox.showerror("Error", "Failed to fetch logs.")
+                self.fetch_results.put((key, None, ("Error", "Failed to fetch logs.")))
         except requests.exceptions.RequestException as e:
-            messagebox.showerror("Connection Error", f"Could not connect: {e}")
+            self.fetch_results.put((key, None, ("Connection Error", f"Could not connect: {e}")))
+
+    def process_fetch_results(self):
+        """Applies finished fetches on the Tk main thread and keeps polling while any are running."""
+        while True:
+            try:
+                key, data, error = self.fetch_results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_fetches.discard(key)
+            if isinstance(key, tuple):
+                self.apply_range(key[0], key[1], data, error)
+            else:
+                self.apply_day(key, data, error)
+        if self.pending_fetches:
+            self.root.after(RESULT_POLL_INTERVAL, self.process_fetch_results)
+
+    def apply_day(self, day, data, error):
+        if data is None:
+            self.report_fetch_error(day, error)
+            return
+        logs = data.get("logs", [])
+        self.log_cache.put(day, logs)
+        self.mark_worked_day(day, sum(log.get('duration') or 0 for log in logs))
+        if day == self.selected_date:
+            self.update_logs_tab(logs)
+            self.refresh_reports()
+
+    def apply_range(self, start, end, data, error):
+        if data is None:
+            if start <= self.selected_date <= end:
+                self.report_fetch_error(self.selected_date, error)
+            return
+        logs_by_day = {}
+        for log in data.get("logs", []):
+            logs_by_day.setdefault(log['start_day'], []).append(log)
+        for day in days_between(date.fromisoformat(start), date.fromisoformat(end)):
+            self.log_cache.put(day, logs_by_day.get(day, []))
+        for totals in data.get("days", []):
+            self.mark_worked_day(totals['day'], totals['total_duration'])
+        if start <= self.selected_date <= end:
+            self.update_logs_tab(self.log_cache.get(self.selected_date))
+        self.refresh_reports()
+
+    def report_fetch_error(self, day, error):
+        # Prefetch failures stay quiet; only the day being looked at reports errors.
+        if day == self.selected_date and self.log_cache.get(day) is None:
+            self.total_time_label.config(text="Total time worked: unavailable")
+            messagebox.showerror(*error)
+
+    def mark_worked_day(self, day, total_minutes):
+        """Highlights a day with sessions on the calendar, labelled with its hours."""
+        if total_minutes <= 0:
+            return
+        text = f"{total_minutes / 60:.1f} h worked"
+        event_id = self.worked_day_events.get(day)
+        if event_id is None:
+            self.worked_day_events[day] = self.cal.calevent_create(date.fromisoformat(day), text, tags='worked')
+        else:
+            self.cal.calevent_configure(event_id, text=text)
+
+    def report_range(self):
+        """First and last day covered by the selected report period, never past today."""
+        selected = date.fromisoformat(self.selected_date)
+        period = self.report_period.get()
+        if period == "Week":
+            start = selected - timedelta(days=selected.weekday())
+            end = start + timedelta(days=6)
+            title = f"Week of {start.isoformat()}"
+        elif period == "Month":
+            start, end = month_bounds(selected.year, selected.month)
+            title = selected.strftime("%B %Y")
+        else:
+            start = end = selected
+            title = f"Performance on {selected.isoformat()}"
+        return start, min(end, date.today()), title
+
+    def refresh_reports(self):
+        """Redraws the Reports tab for the selected period, fetching the period in one request if needed."""
+        if self.selected_date is None or not self.charts_ready or not self.reports_visible():
+            return
+        start, end, title = self.report_range()
+        self.report_title.config(text=title)
+        logs = []
+        for day in days_between(start, end):
+            day_logs = self.log_cache.get(day)
+            if day_logs is None:
+                # Drawn once the fetch lands
+                if start != end and not self.range_pending_for(day):
+                    self.request_range(start.isoformat(), end.isoformat())
+                return
+            logs.extend(day_logs)
+        self.update_reports_tab(logs)
 
     def update_logs_tab(self, logs):
         for i in self.tree.get_children(): self.tree.delete(i)
@@ -212,42 +509,110 @@ class TimeTrackerApp:
         if not logs:
             self.summary_text.insert(tk.END, "No sessions for this day.")
         else:
-            df = pd.DataFrame(logs)
             self.summary_text.insert(tk.END, "--- Time by Task ---\n")
-            task_summary = df.groupby('task_name')['duration'].sum()
-            for task, dur in task_summary.items(): self.summary_text.insert(tk.END, f"{task or 'N/A':<20} {dur:>7.2f} min\n")
+            for task, dur in total_by(logs, 'task_name').items(): self.summary_text.insert(tk.END, f"{task:<20} {dur:>7.2f} min\n")
             
             self.summary_text.insert(tk.END, "\n--- Time by App ---\n")
-            app_summary = df.groupby('app_name')['duration'].sum()
-            for app, dur in app_summary.items(): self.summary_text.insert(tk.END, f"{app:<20} {dur:>7.2f} min\n")
+            for app, dur in total_by(logs, 'app_name').items(): self.summary_text.insert(tk.END, f"{app:<20} {dur:>7.2f} min\n")
         self.summary_text.config(state='disabled')
 
     def update_reports_tab(self, logs):
-        for ax in [self.task_ax, self.app_ax]: ax.clear()
-        
-        if not logs:
-            for ax in [self.task_ax, self.app_ax]:
-                ax.text(0.5, 0.5, 'No data for this day', ha='center', va='center')
-        else:
-            df = pd.DataFrame(logs)
-            
-            # Chart
-            task_summary = df.groupby('task_name')['duration'].sum()
-            self.task_ax.pie(task_summary, labels=task_summary.index, autopct='%1.1f%%', startangle=90, colors=MODERN_COLORS, wedgeprops=dict(width=0.4))
-            self.task_ax.axis('equal')
-            self.task_ax.set_title("Task Breakdown")
-
-            # Bar Chart
-            app_summary = df.groupby('app_name')['duration'].sum()
-            self.app_ax.bar(app_summary.index, app_summary.values, color=MODERN_COLORS)
-            self.app_ax.set_ylabel('Duration (minutes)')
-            self.app_ax.set_title("Application Usage")
-            self.app_ax.tick_params(axis='x', rotation=45)
-
-        self.task_fig.tight_layout()
-        self.app_fig.tight_layout()
-        self.task_canvas.draw()
-        self.app_canvas.draw()
+        if logs == self.shown_report_logs:
+            return
+        self.shown_report_logs = logs
+        task_summary = total_by(logs, 'task_name')
+        app_summary = total_by(logs, 'app_name')
+        # Only figures whose totals changed are redrawn, and draw_idle lets Tk
+        # fold several quick date changes into a single render.
+        changed = []
+        self.redraw_started = time.perf_counter()
+        self.redraw_relaid = False
+        if task_summary != self.task_summary:
+            self.task_summary = task_summary
+            self.redraw_relaid |= self.update_task_chart(task_summary)
+            changed.append(self.task_canvas)
+        if app_summary != self.app_summary:
+            self.app_summary = app_summary
+            self.redraw_relaid |= self.update_app_chart(app_summary)
+            changed.append(self.app_canvas)
+        if not changed:
+            self.redraw_started = None
+            return
+        self.pending_chart_draws = len(changed)
+        for canvas in changed:
+            canvas.draw_idle()
+
+    def update_task_chart(self, summary):
+        """Updates the task pie in place. Returns True if the chart had to be rebuilt and laid out again."""
+        labels = tuple(summary)
+        if labels != self.task_labels:
+            self.task_labels = labels
+            self.task_ax.clear()
+            if not labels:
+                self.task_wedges, self.task_label_texts, self.task_pct_texts = [], [], []
+                self.task_ax.text(0.5, 0.5, 'No data for this period', ha='center', va='center')
+            else:
+                self.task_wedges, self.task_label_texts, self.task_pct_texts = self.task_ax.pie(
+                    list(summary.values()), labels=list(labels), autopct='%1.1f%%', startangle=PIE_START_ANGLE,
+                    labeldistance=PIE_LABEL_DISTANCE, pctdistance=PIE_PCT_DISTANCE,
+                    colors=MODERN_COLORS, wedgeprops=dict(width=0.4))
+                self.task_ax.axis('equal')
+                self.task_ax.set_title("Task Breakdown")
+            self.task_fig.tight_layout()
+            return True
+
+        # Same tasks: move the wedge edges and their labels, as ax.pie would place them
+        total = sum(summary.values()) or 1
+        theta = PIE_START_ANGLE
+        for wedge, label_text, pct_text, value in zip(self.task_wedges, self.task_label_texts, self.task_pct_texts, summary.values()):
+            span = 360 * value / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + span)
+            middle = math.radians(theta + span / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            label_text.set_position((PIE_LABEL_DISTANCE * x, PIE_LABEL_DISTANCE * y))
+            label_text.set_horizontalalignment('left' if x > 0 else 'right')
+            pct_text.set_position((PIE_PCT_DISTANCE * x, PIE_PCT_DISTANCE * y))
+            pct_text.set_text(f"{100 * value / total:.1f}%")
+            theta += span
+        return False
+
+    def update_app_chart(self, summary):
+        """Updates the app bar heights in place. Returns True if the chart had to be rebuilt and laid out again."""
+        labels = tuple(summary)
+        if labels != self.app_labels:
+            self.app_labels = labels
+            self.app_ax.clear()
+            if not labels:
+                self.app_bars = []
+                self.app_ax.text(0.5, 0.5, 'No data for this period', ha='center', va='center')
+            else:
+                self.app_bars = self.app_ax.bar(list(labels), list(summary.values()), color=MODERN_COLORS)
+                self.app_ax.set_ylabel('Duration (minutes)')
+                self.app_ax.set_title("Application Usage")
+                self.app_ax.tick_params(axis='x', rotation=45)
+            self.app_fig.tight_layout()
+            return True
+
+        # Same apps: only the heights and the y range change
+        for bar, value in zip(self.app_bars, summary.values()):
+            bar.set_height(value)
+        if self.app_bars:
+            self.app_ax.relim()
+            self.app_ax.autoscale_view(scalex=False)
+        return False
+
+    def on_chart_drawn(self, event):
+        """Reports the time from a data change until both charts have been rendered."""
+        if self.redraw_started is None:
+            return
+        self.pending_chart_draws -= 1
+        if self.pending_chart_draws > 0:
+            return
+        elapsed = time.perf_counter() - self.redraw_started
+        self.redraw_started = None
+        if self.redraw_timing:
+            print(f"Reports redraw: {elapsed * 1000:6.1f} ms ({'rebuilt' if self.redraw_relaid else 'in place'})")
 
     def launch_dashboard(self):
         import webbrowser
@@ -257,9 +622,25 @@ class TimeTrackerApp:
         for widget in self.root.winfo_children():
             widget.destroy()
 
+def report_startup_timing(root):
+    """--startup-timing: prints how long the login screen took and what each deferred import costs, then exits."""
+    root.update()
+    shown = time.perf_counter()
+    print(f"Startup imports:      {(STARTUP_IMPORTS_DONE - STARTUP_STARTED) * 1000:7.0f} ms")
+    print(f"Login screen shown:   {(shown - STARTUP_STARTED) * 1000:7.0f} ms")
+    for name in DEFERRED_IMPORTS:
+        lazy_import(name)
+    print("Deferred imports (loaded after the login screen):")
+    for name in DEFERRED_IMPORTS:
+        print(f"  {name:<36} {import_times.get(name, 0) * 1000:7.0f} ms")
+    root.destroy()
+
 if __name__ == "__main__":
-    plt.style.use('seaborn-v0_8-whitegrid')
     root = tk.Tk()
     app = TimeTrackerApp(root)
-    root.mainloop()
-
+    app.redraw_timing = "--redraw-timing" in sys.argv
+    if "--startup-timing" in sys.argv:
+        report_startup_timing(root)
+    else:
+        threading.Thread(target=preload_modules, daemon=True).start()
+        root.mainloop()
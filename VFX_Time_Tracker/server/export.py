@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+import server as tracker_server
+import run
+from server import COLUMNAR_EXPORT_FORMATS, COLUMNAR_BATCH_SIZE, import_pyarrow, write_sessions_columnar
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exports stopped sessions, joined with users and tasks, to Parquet or an Arrow IPC file.")
+    parser.add_argument("--format", choices=sorted(COLUMNAR_EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", help="file to write (default: time_tracker_export_<today>.<format>)")
+    parser.add_argument("--db", default=tracker_server.DATABASE, help="database to read")
+    parser.add_argument("--start-date", help="first start day to include, YYYY-MM-DD")
+    parser.add_argument("--end-date", help="last start day to include, YYYY-MM-DD")
+    parser.add_argument("--artist", help="only this username")
+    parser.add_argument("--batch-size", type=int, default=COLUMNAR_BATCH_SIZE, help="rows per batch / row group")
+    args = parser.parse_args()
+
+    if import_pyarrow() is None:
+        print("ERROR: Parquet and Arrow export need pyarrow. Install it with 'pip install pyarrow'.")
+        sys.exit(1)
+    if not os.path.exists(args.db):
+        print(f"ERROR: Database '{args.db}' not found.")
+        sys.exit(1)
+    output = args.output or f"time_tracker_export_{datetime.utcnow().date().isoformat()}.{args.format}"
+
+    # Older databases lack columns the export reads (start_day, ...).
+    tracker_server.DATABASE = run.DATABASE = args.db
+    run.migrate_database()
+    started = time.perf_counter()
+    rows = 0
+    for rows in write_sessions_columnar(output, args.format, args.start_date, args.end_date, args.artist,
+                                        args.batch_size):
+        print(f"  {rows:,} sessions...", end="\r")
+    tracker_server.shutdown()
+    print(f"Exported {rows:,} sessions to '{output}' ({os.path.getsize(output) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - started:.1f}s.")
+
+if __name__ == '__main__':
+    main()
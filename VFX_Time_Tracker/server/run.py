@@ -1,41 +1,234 @@
-import os
-import sqlite3
-from server import app # Flask app instance from server.py
-
-# Config
-DATABASE = "server_time_logs.db"
-SCHEMA = "schema.sql"
-
-def initialize_database():
-    """
-    Checks if the database file exists. If not, it creates it
-    and populates it with the schema from schema.sql.
-    """
-    if not os.path.exists(DATABASE):
-        print(f"Database not found at '{DATABASE}'. Initializing...")
-        try:
-            conn = sqlite3.connect(DATABASE)
-            
-            with open(SCHEMA, 'r') as f:
-                conn.cursor().executescript(f.read())
-            
-            conn.commit()
-            conn.close()
-            print("Database initialized successfully.")
-        except FileNotFoundError:
-            print(f"ERROR: Could not find '{SCHEMA}'. Please ensure it is in the same directory.")
-            exit()
-        except Exception as e:
-            print(f"An error occurred during database initialization: {e}")
-            exit()
-    else:
-        print("Database already exists. Skipping initialization.")
-
-if __name__ == '__main__':
-    
-    initialize_database()
-    
-    print("Starting VFX Time Tracker server...")
-    print("Access the Manager Dashboard at http://127.0.0.1:5000/dashboard")
-    app.run(host='0.0.0.0', port=5000, debug=False)
-
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import sqlite3
+import server as tracker_server
+from server import app, rebuild_daily_rollups, start_session_reaper, shutdown, token_secret # Flask app instance from server.py
+
+# Config
+DATABASE = "server_time_logs.db"
+SCHEMA = "schema.sql"
+HOST = os.environ.get("VFX_TRACKER_HOST", "0.0.0.0")
+PORT = int(os.environ.get("VFX_TRACKER_PORT", 5000))
+# Production serving. Everything can also be set from the command line, see --help.
+SERVER_MODE = os.environ.get("VFX_TRACKER_MODE", "development")
+WORKERS = int(os.environ.get("VFX_TRACKER_WORKERS", 1))
+THREADS = int(os.environ.get("VFX_TRACKER_THREADS", 8))
+GRACEFUL_TIMEOUT = 30  # seconds in-flight requests get to finish on shutdown
+
+def initialize_database():
+    """
+    Checks if the database file exists. If not, it creates it
+    and populates it with the schema from schema.sql.
+    """
+    if not os.path.exists(DATABASE):
+        print(f"Database not found at '{DATABASE}'. Initializing...")
+        try:
+            conn = sqlite3.connect(DATABASE)
+            
+            with open(SCHEMA, 'r') as f:
+                conn.cursor().executescript(f.read())
+            
+            conn.commit()
+            conn.close()
+            print("Database initialized successfully.")
+        except FileNotFoundError:
+            print(f"ERROR: Could not find '{SCHEMA}'. Please ensure it is in the same directory.")
+            exit()
+        except Exception as e:
+            print(f"An error occurred during database initialization: {e}")
+            exit()
+    else:
+        print("Database already exists. Skipping initialization.")
+
+def migrate_database():
+    """
+    Brings an existing database up to the current schema.
+    Every step is idempotent, so this is safe to run on every start.
+    """
+    conn = sqlite3.connect(DATABASE)
+    try:
+        session_columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "start_day" not in session_columns:
+            print("Migrating database: adding sessions.start_day...")
+            conn.execute("ALTER TABLE sessions ADD COLUMN start_day TEXT")
+            conn.execute("UPDATE sessions SET start_day = date(start_time)")
+        if "client_key" not in session_columns:
+            print("Migrating database: adding sessions.client_key...")
+            conn.execute("ALTER TABLE sessions ADD COLUMN client_key TEXT")
+
+        event_columns = {row[1] for row in conn.execute("PRAGMA table_info(activity_events)")}
+        if "event_key" not in event_columns:
+            print("Migrating database: adding activity_events.event_key...")
+            conn.execute("ALTER TABLE activity_events ADD COLUMN event_key TEXT")
+
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_status_day ON sessions (status, start_day)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_day ON sessions (user_id, start_day)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_client_key ON sessions (client_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_status_heartbeat ON sessions (status, last_heartbeat)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_overnight ON sessions (start_day) "
+                     "WHERE status = 'stopped' AND end_time >= date(start_day, '+1 day')")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_events_session_time ON activity_events (session_id, timestamp)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_activity_events_key ON activity_events (event_key)")
+
+        has_rollups = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_rollups'").fetchone()
+        if not has_rollups:
+            print("Migrating database: creating daily_rollups...")
+            conn.execute("""
+                CREATE TABLE daily_rollups (
+                    day TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    app_name TEXT NOT NULL,
+                    task_id INTEGER NOT NULL DEFAULT 0,
+                    total_duration REAL NOT NULL DEFAULT 0,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, user_id, app_name, task_id)
+                )
+            """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ingested_events (
+                event_key TEXT PRIMARY KEY,
+                received_at TIMESTAMP NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ingested_events_received_at ON ingested_events (received_at)")
+        conn.commit()
+        if not has_rollups:
+            rebuild_daily_rollups(conn)
+    finally:
+        conn.close()
+
+def rebuild_rollups():
+    """Recomputes the dashboard's daily rollups from the sessions table."""
+    conn = sqlite3.connect(DATABASE)
+    try:
+        rebuild_daily_rollups(conn)
+    finally:
+        conn.close()
+    print("Daily rollups rebuilt.")
+
+def serve_threaded(host, port, threads):
+    """
+    Serves the app from one process with a pool of worker threads (waitress).
+    Works on every platform. The heartbeat buffer and dashboard cache stay
+    shared by all requests, so this is the preferred production mode.
+    """
+    try:
+        from waitress import create_server
+    except ImportError:
+        print("ERROR: Production mode needs waitress. Install it with 'pip install waitress'.")
+        sys.exit(1)
+
+    server = create_server(app, host=host, port=port, threads=threads)
+    draining = threading.Event()
+
+    def drain():
+        """Runs queued and in-flight requests to completion, then stops the main loop."""
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        dispatcher = server.task_dispatcher
+        while dispatcher.queue and time.monotonic() < deadline:
+            time.sleep(0.1)
+        dispatcher.shutdown(cancel_pending=False, timeout=max(deadline - time.monotonic(), 0))
+        # The main loop writes the responses out, so keep it running until they are sent.
+        while (any(channel.total_outbufs_len for channel in list(server.active_channels.values()))
+               and time.monotonic() < deadline):
+            time.sleep(0.1)
+        signal.raise_signal(signal.SIGTERM)
+        server.pull_trigger()
+
+    def stop(signum, frame):
+        # On its own, waitress gives running requests 5 seconds on SystemExit and
+        # cancels queued ones, so the first signal drains in a thread instead.
+        if draining.is_set():
+            sys.exit(0)
+        draining.set()
+        server.accepting = False
+        print(f"Shutting down, letting requests finish for up to {GRACEFUL_TIMEOUT}s...")
+        threading.Thread(target=drain, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Serving on http://{host}:{port} with {threads} threads (waitress).")
+    try:
+        server.run()
+    finally:
+        shutdown()
+
+def serve_multiprocess(host, port, workers, threads):
+    """
+    Serves the app from several forked worker processes (gunicorn, POSIX only).
+    The database is initialized in this process before any worker forks. Each
+    worker starts its own reaper and heartbeat flusher and, on exit, flushes
+    its buffered heartbeats.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("ERROR: Multi-process mode needs gunicorn (Linux/macOS). Install it with 'pip install gunicorn'.")
+        sys.exit(1)
+
+    def post_fork(arbiter, worker):
+        # A write handled by one worker can't invalidate another worker's dashboard
+        # cache, so no entry may outlive the short TTL.
+        tracker_server.DASHBOARD_CLOSED_RANGE_TTL = tracker_server.DASHBOARD_CACHE_TTL
+        start_session_reaper()
+
+    def worker_exit(arbiter, worker):
+        shutdown()
+
+    class TrackerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("graceful_timeout", GRACEFUL_TIMEOUT)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+            self.cfg.set("worker_exit", worker_exit)
+
+        def load(self):
+            return app
+
+    print(f"Serving on http://{host}:{port} with {workers} workers x {threads} threads (gunicorn).")
+    TrackerApplication().run()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="VFX Time Tracker server")
+    parser.add_argument("--production", action="store_const", const="production", dest="mode", default=SERVER_MODE,
+                        help="serve with a production WSGI server instead of Flask's development server")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="worker processes in production mode; more than 1 needs gunicorn")
+    parser.add_argument("--threads", type=int, default=THREADS, help="threads per worker in production mode")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="recompute the dashboard's daily rollups and exit")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    # Runs once, in this process, before any worker is started or forked.
+    initialize_database()
+    migrate_database()
+
+    if args.rebuild_rollups:
+        rebuild_rollups()
+        sys.exit()
+    
+    token_secret() # Load or create the signing key before any worker forks
+    print("Starting VFX Time Tracker server...")
+    print(f"Access the Manager Dashboard at http://127.0.0.1:{args.port}/dashboard")
+    if args.mode == "production" and args.workers > 1:
+        serve_multiprocess(args.host, args.port, args.workers, args.threads)
+    elif args.mode == "production":
+        start_session_reaper()
+        serve_threaded(args.host, args.port, args.threads)
+    else:
+        start_session_reaper()
+        app.run(host=args.host, port=args.port, debug=False)
@@ -1,57 +1,92 @@
--- Drop existing tables if they exist to start fresh
-DROP TABLE IF EXISTS activity_events;
-DROP TABLE IF EXISTS sessions;
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS tasks;
-
--- Users table to store artist login information
-CREATE TABLE users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
--- Tasks table to store the list of possible tasks
-CREATE TABLE tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task_name TEXT UNIQUE NOT NULL
-);
-
--- Sessions table to log the time for each work session
-CREATE TABLE sessions (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER NOT NULL,
-    task_id INTEGER,
-    app_name TEXT NOT NULL,
-    session_name TEXT,
-    scene_path TEXT,
-    start_time TIMESTAMP NOT NULL,
-    end_time TIMESTAMP,
-    last_heartbeat TIMESTAMP,
-    duration REAL, -- Total duration in minutes, excluding paused time
-    paused_duration REAL DEFAULT 0, -- Total accumulated paused time in minutes
-    status TEXT DEFAULT 'active', -- Can be 'active', 'paused', or 'stopped'
-    FOREIGN KEY (user_id) REFERENCES users (id),
-    FOREIGN KEY (task_id) REFERENCES tasks (id)
-);
-
--- Activity events for more detailed, granular tracking 
-CREATE TABLE activity_events (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    session_id INTEGER NOT NULL,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    event_type TEXT NOT NULL,
-    event_data TEXT,
-    FOREIGN KEY (session_id) REFERENCES sessions (id)
-);
-
--- --- Initial Data ---
--- Insert some default tasks to get started
-INSERT INTO tasks (task_name) VALUES ('Modeling');
-INSERT INTO tasks (task_name) VALUES ('Texturing');
-INSERT INTO tasks (task_name) VALUES ('Rigging');
-INSERT INTO tasks (task_name) VALUES ('Animation');
-INSERT INTO tasks (task_name) VALUES ('Lighting');
-INSERT INTO tasks (task_name) VALUES ('Compositing');
-INSERT INTO tasks (task_name) VALUES ('General');
+-- Drop existing tables if they exist to start fresh
+DROP TABLE IF EXISTS ingested_events;
+DROP TABLE IF EXISTS daily_rollups;
+DROP TABLE IF EXISTS activity_events;
+DROP TABLE IF EXISTS sessions;
+DROP TABLE IF EXISTS users;
+DROP TABLE IF EXISTS tasks;
+
+-- Users table to store artist login information
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tasks table to store the list of possible tasks
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_name TEXT UNIQUE NOT NULL
+);
+
+-- Sessions table to log the time for each work session
+CREATE TABLE sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    task_id INTEGER,
+    app_name TEXT NOT NULL,
+    session_name TEXT,
+    scene_path TEXT,
+    start_time TIMESTAMP NOT NULL,
+    start_day TEXT, -- date(start_time) as 'YYYY-MM-DD', stored so day filters can use an index
+    end_time TIMESTAMP,
+    last_heartbeat TIMESTAMP,
+    duration REAL, -- Total duration in minutes, excluding paused time
+    paused_duration REAL DEFAULT 0, -- Total accumulated paused time in minutes
+    status TEXT DEFAULT 'active', -- Can be 'active', 'paused', or 'stopped'
+    client_key TEXT, -- Session key generated by a DCC client, used by /api/session/sync
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (task_id) REFERENCES tasks (id)
+);
+
+-- Indexes for the dashboard and per-day log lookups
+CREATE INDEX idx_sessions_status_day ON sessions (status, start_day);
+CREATE INDEX idx_sessions_user_day ON sessions (user_id, start_day);
+CREATE UNIQUE INDEX idx_sessions_client_key ON sessions (client_key);
+CREATE INDEX idx_sessions_status_heartbeat ON sessions (status, last_heartbeat);
+-- Sessions that run past midnight, which /api/timeseries splits across days
+CREATE INDEX idx_sessions_overnight ON sessions (start_day) WHERE status = 'stopped' AND end_time >= date(start_day, '+1 day');
+
+-- Activity events for more detailed, granular tracking 
+CREATE TABLE activity_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    event_type TEXT NOT NULL,
+    event_data TEXT,
+    event_key TEXT, -- Client-generated key so resent batches aren't inserted twice
+    FOREIGN KEY (session_id) REFERENCES sessions (id)
+);
+
+CREATE INDEX idx_activity_events_session_time ON activity_events (session_id, timestamp);
+CREATE UNIQUE INDEX idx_activity_events_key ON activity_events (event_key);
+
+-- Per-day totals maintained by session_stop, read by the manager dashboard.
+-- task_id 0 means the session had no task.
+CREATE TABLE daily_rollups (
+    day TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    app_name TEXT NOT NULL,
+    task_id INTEGER NOT NULL DEFAULT 0,
+    total_duration REAL NOT NULL DEFAULT 0, -- Summed session duration in minutes
+    session_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, user_id, app_name, task_id)
+);
+
+-- Keys of lifecycle events already applied by /api/session/sync, so replays are ignored
+CREATE TABLE ingested_events (
+    event_key TEXT PRIMARY KEY,
+    received_at TIMESTAMP NOT NULL
+);
+CREATE INDEX idx_ingested_events_received_at ON ingested_events (received_at);
+
+-- --- Initial Data ---
+-- Insert some default tasks to get started
+INSERT INTO tasks (task_name) VALUES ('Modeling');
+INSERT INTO tasks (task_name) VALUES ('Texturing');
+INSERT INTO tasks (task_name) VALUES ('Rigging');
+INSERT INTO tasks (task_name) VALUES ('Animation');
+INSERT INTO tasks (task_name) VALUES ('Lighting');
+INSERT INTO tasks (task_name) VALUES ('Compositing');
+INSERT INTO tasks (task_name) VALUES ('General');
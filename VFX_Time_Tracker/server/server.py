@@ -1,241 +1,1661 @@
-import sqlite3
-from datetime import datetime
-from flask import Flask, request, jsonify, render_template
-from werkzeug.security import generate_password_hash, check_password_hash
-import pandas as pd
-
-app = Flask(__name__)
-DATABASE = "server_time_logs.db"
-
-# Database Functions 
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-#  Web Page Route 
-@app.route('/dashboard')
-def dashboard():
-    """Serves the main manager dashboard web page."""
-    return render_template('index.html')
-
-
-#  API Endpoints 
-
-@app.route('/api/users', methods=['GET'])
-def get_users():
-    conn = get_db()
-    rows = conn.execute("SELECT id, username FROM users ORDER BY username").fetchall()
-    conn.close()
-    users = [dict(row) for row in rows]
-    return jsonify({"status": "success", "users": users})
-
-@app.route('/api/tasks', methods=['GET'])
-def get_tasks():
-    conn = get_db()
-    rows = conn.execute("SELECT id, task_name FROM tasks ORDER BY task_name").fetchall()
-    conn.close()
-    tasks = [dict(row) for row in rows]
-    return jsonify({"status": "success", "tasks": tasks})
-
-
-@app.route('/api/dashboard_stats', methods=['GET'])
-def dashboard_stats():
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    artist_username = request.args.get('artist')
-
-    conn = get_db()
-    
-    base_query = """
-        SELECT u.username, s.app_name, s.duration, t.task_name, s.session_name, s.end_time
-        FROM sessions s
-        JOIN users u ON s.user_id = u.id
-        LEFT JOIN tasks t ON s.task_id = t.id
-        WHERE s.status = 'stopped' AND s.duration IS NOT NULL
-    """
-    params = []
-    if start_date:
-        base_query += " AND date(s.start_time) >= ?"
-        params.append(start_date)
-    if end_date:
-        base_query += " AND date(s.start_time) <= ?"
-        params.append(end_date)
-    if artist_username:
-        base_query += " AND u.username = ?"
-        params.append(artist_username)
-
-    df = pd.read_sql_query(base_query, conn, params=tuple(params))
-    conn.close()
-
-    if df.empty:
-        stats = {
-            "total_hours": 0, "top_artist": "N/A", "hours_per_artist": [],
-            "hours_per_app": [], "hours_per_task": [], "recent_sessions": [],
-            "all_sessions_for_export": []
-        }
-        return jsonify({"status": "success", "stats": stats})
-
-    total_hours = df['duration'].sum() / 60
-    hours_per_artist = df.groupby('username')['duration'].sum().div(60).reset_index(name='total_duration').sort_values(by='total_duration', ascending=False)
-    hours_per_app = df.groupby('app_name')['duration'].sum().div(60).reset_index(name='total_duration').sort_values(by='total_duration', ascending=False)
-    hours_per_task = df.groupby('task_name')['duration'].sum().div(60).reset_index(name='total_duration').sort_values(by='total_duration', ascending=False)
-    top_artist = hours_per_artist.iloc[0]['username'] if not hours_per_artist.empty else "N/A"
-    recent_sessions_df = df.sort_values(by='end_time', ascending=False).head(5)
-
-    stats = {
-        "total_hours": total_hours, "top_artist": top_artist,
-        "hours_per_artist": hours_per_artist.to_dict('records'),
-        "hours_per_app": hours_per_app.to_dict('records'),
-        "hours_per_task": hours_per_task.to_dict('records'),
-        "recent_sessions": recent_sessions_df.to_dict('records'),
-        "all_sessions_for_export": df.to_dict('records')
-    }
-    return jsonify({"status": "success", "stats": stats})
-
-
-@app.route('/api/register', methods=['POST'])
-def register():
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
-    conn = get_db()
-    if conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
-        conn.close()
-        return jsonify({"status": "error", "message": f"User {username} is already registered."}), 409
-    conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
-                 (username, generate_password_hash(password)))
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "success", "message": "User created successfully."}), 201
-
-@app.route('/api/login', methods=['POST'])
-def login():
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
-    conn = get_db()
-    user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    conn.close()
-    if user is None or not check_password_hash(user['password_hash'], password):
-        return jsonify({"status": "error", "message": "Invalid username or password."}), 401
-    return jsonify({"status": "success", "user": {"id": user['id'], "username": user['username']}})
-
-@app.route('/api/session/start', methods=['POST'])
-def session_start():
-    data = request.get_json()
-    now = datetime.utcnow()
-    conn = get_db()
-    cursor = conn.cursor()
-    user_id = data.get('user_id')
-    task_id = data.get('task_id')
-
-    if not user_id:
-        conn.close()
-        return jsonify({"status": "error", "message": "user_id is required."}), 400
-
-    cursor.execute(
-        "INSERT INTO sessions (user_id, task_id, app_name, session_name, scene_path, start_time, last_heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (user_id, task_id, data.get('dcc_name'), data.get('project_name'), data.get('scene_name'), now, now)
-    )
-    conn.commit()
-    session_id = cursor.lastrowid
-    conn.close()
-    return jsonify({"status": "success", "session_id": session_id}), 201
-
-@app.route('/api/session/pause', methods=['POST'])
-def session_pause():
-    data = request.get_json()
-    session_id = data.get('session_id')
-    conn = get_db()
-    conn.execute('UPDATE sessions SET status = "paused", last_heartbeat = ? WHERE id = ? AND status = "active"',
-                 (datetime.utcnow(), session_id))
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "session_paused"})
-
-@app.route('/api/session/resume', methods=['POST'])
-def session_resume():
-    data = request.get_json()
-    session_id = data.get('session_id')
-    conn = get_db()
-    
-    session = conn.execute('SELECT last_heartbeat, paused_duration FROM sessions WHERE id = ? AND status = "paused"', (session_id,)).fetchone()
-    if not session:
-        conn.close()
-        return jsonify({"status": "error", "message": "Session not found or not paused"}), 404
-
-    pause_start_time = datetime.fromisoformat(session['last_heartbeat'])
-    resume_time = datetime.utcnow()
-    pause_duration_seconds = (resume_time - pause_start_time).total_seconds()
-    
-    new_total_paused_duration = (session['paused_duration'] or 0) + (pause_duration_seconds / 60)
-
-    conn.execute('UPDATE sessions SET status = "active", last_heartbeat = ?, paused_duration = ? WHERE id = ?',
-                 (resume_time, new_total_paused_duration, session_id))
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "session_resumed"})
-
-
-@app.route('/api/session/heartbeat', methods=['POST'])
-def session_heartbeat():
-    data = request.get_json()
-    conn = get_db()
-    conn.execute('UPDATE sessions SET last_heartbeat = ? WHERE id = ? AND status = "active"',
-                 (datetime.utcnow(), data.get('session_id')))
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "acknowledged"})
-
-@app.route('/api/session/stop', methods=['POST'])
-def session_stop():
-    data = request.get_json()
-    session_id = data.get('session_id')
-    conn = get_db()
-    session = conn.execute('SELECT start_time, paused_duration FROM sessions WHERE id = ?', (session_id,)).fetchone()
-    if not session:
-        conn.close()
-        return jsonify({"status": "error", "message": "Session not found"}), 404
-    
-    start_time = datetime.fromisoformat(session['start_time'])
-    end_time = datetime.utcnow()
-    total_paused_duration_minutes = session['paused_duration'] or 0
-    
-    total_duration_minutes = (end_time - start_time).total_seconds() / 60
-    active_duration = round(total_duration_minutes - total_paused_duration_minutes, 2)
-    
-    conn.execute('UPDATE sessions SET end_time = ?, duration = ?, status = "stopped" WHERE id = ?',
-                 (end_time, active_duration, session_id))
-    conn.commit()
-    conn.close()
-    return jsonify({"status": "session_stopped"})
-
-@app.route('/api/get_logs', methods=['GET'])
-def get_logs():
-    user_id = request.args.get('user_id')
-    date = request.args.get('date')
-    conn = get_db()
-    rows = conn.execute("""
-        SELECT s.id, u.username, s.app_name, s.session_name, t.task_name, s.start_time, s.end_time, s.duration
-        FROM sessions s 
-        JOIN users u ON s.user_id = u.id
-        LEFT JOIN tasks t ON s.task_id = t.id
-        WHERE s.user_id = ? AND date(s.start_time) = ? AND s.status = "stopped"
-        ORDER BY s.start_time
-    """, (user_id, date)).fetchall()
-    conn.close()
-    logs = [dict(row) for row in rows]
-    return jsonify({"status": "success", "logs": logs})
-
-@app.route('/api/get_session_events', methods=['GET'])
-def get_session_events():
-    session_id = request.args.get('session_id')
-    if not session_id:
-        return jsonify({"status": "error", "message": "session_id parameter is required"}), 400
-    conn = get_db()
-    rows = conn.execute("SELECT timestamp, event_type, event_data FROM activity_events WHERE session_id = ? ORDER BY timestamp",
-                        (session_id,)).fetchall()
-    conn.close()
-    events = [dict(row) for row in rows]
-    return jsonify({"status": "success", "events": events})
+import os
+import sqlite3
+import threading
+import atexit
+import base64
+import csv
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import secrets
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder is used instead
+    orjson = None
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+app = Flask(__name__)
+DATABASE = "server_time_logs.db"
+
+# Metrics
+# Request and SQLite timings kept in memory and served by /metrics in the
+# Prometheus text format. Recording a sample is a bisect and a few additions
+# under one lock, so this stays on in production. With several gunicorn
+# workers every worker reports its own numbers.
+METRICS_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+_metrics_lock = threading.Lock()
+_request_metrics = {}  # (method, route) -> {"latency": LatencyHistogram, "statuses": {code: count}, "errors": n}
+_db_metrics = {}  # (operation, statement) -> LatencyHistogram
+
+class LatencyHistogram:
+    """Cumulative latency buckets plus sum and count, as Prometheus expects."""
+    def __init__(self):
+        self.buckets = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(METRICS_LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def render(self, name, labels=""):
+        lines, cumulative = [], 0
+        for bound, hits in zip(METRICS_LATENCY_BUCKETS + ("+Inf",), self.buckets):
+            cumulative += hits
+            lines.append(f'{name}_bucket{{{labels + "," if labels else ""}le="{bound}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f'{name}_sum{suffix} {self.total:.6f}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+def observe_request(method, route, status, seconds):
+    with _metrics_lock:
+        metrics = _request_metrics.get((method, route))
+        if metrics is None:
+            metrics = _request_metrics[(method, route)] = {"latency": LatencyHistogram(), "statuses": {}, "errors": 0}
+        metrics["latency"].observe(seconds)
+        metrics["statuses"][status] = metrics["statuses"].get(status, 0) + 1
+        if status >= 500:
+            metrics["errors"] += 1
+
+def observe_db(operation, statement, seconds):
+    with _metrics_lock:
+        histogram = _db_metrics.get((operation, statement))
+        if histogram is None:
+            histogram = _db_metrics[(operation, statement)] = LatencyHistogram()
+        histogram.observe(seconds)
+
+def statement_kind(sql):
+    """SELECT, INSERT, UPDATE... so DB timings are labelled without one series per query."""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+# Database Functions 
+# Connections are pooled and reused across requests instead of being opened
+# and closed per call. WAL mode lets dashboard reads run alongside heartbeat writes.
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT = 5  # seconds
+DB_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",  # ~20 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA temp_store = MEMORY",
+)
+_db_pool = []
+_db_pool_lock = threading.Lock()
+
+class PooledConnection(sqlite3.Connection):
+    """
+    A sqlite3 connection whose close() hands it back to the pool.
+    Statements and commits are timed for /metrics. A statement's time covers
+    planning and the first step, which for aggregates and sorts is the whole query.
+    """
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_db("query", statement_kind(sql), time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_db("query", statement_kind(sql), time.perf_counter() - started)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            observe_db("commit", "COMMIT", time.perf_counter() - started)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # `with conn:` commits in C, bypassing commit() above.
+        started = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            if exc_type is None:
+                observe_db("commit", "COMMIT", time.perf_counter() - started)
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        with _db_pool_lock:
+            if len(_db_pool) < DB_POOL_SIZE:
+                _db_pool.append(self)
+                return
+        super().close()
+
+    def close_for_real(self):
+        super().close()
+
+def _open_db():
+    conn = sqlite3.connect(DATABASE, timeout=DB_BUSY_TIMEOUT, factory=PooledConnection,
+                           check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_db():
+    """Returns a pooled connection. Callers still call close() when done."""
+    with _db_pool_lock:
+        if _db_pool:
+            return _db_pool.pop()
+    return _open_db()
+
+def close_db_pool():
+    """Closes every idle pooled connection."""
+    with _db_pool_lock:
+        connections = list(_db_pool)
+        _db_pool.clear()
+    for conn in connections:
+        conn.close_for_real()
+
+# Heartbeat Buffer
+# Heartbeats only matter when a session is paused, resumed, stopped or reaped,
+# so they are coalesced in memory and written to disk in periodic batches.
+HEARTBEAT_FLUSH_INTERVAL = 15  # seconds
+_heartbeat_buffer = {}
+_heartbeat_lock = threading.Lock()
+_heartbeat_flusher = None
+_heartbeat_stop_event = threading.Event()
+
+def buffer_heartbeat(session_id, user_id, timestamp):
+    """Records the latest heartbeat for a session in memory, keyed by the user who sent it."""
+    key = (session_id, user_id)
+    with _heartbeat_lock:
+        current = _heartbeat_buffer.get(key)
+        if current is None or timestamp > current:
+            _heartbeat_buffer[key] = timestamp
+    _start_heartbeat_flusher()
+
+def flush_heartbeats(session_ids=None):
+    """
+    Writes buffered heartbeats to the database in one transaction.
+    If session_ids is given, only those sessions are flushed.
+    """
+    with _heartbeat_lock:
+        if session_ids is None:
+            pending = list(_heartbeat_buffer.items())
+            _heartbeat_buffer.clear()
+        else:
+            session_ids = set(session_ids)
+            pending = [(key, _heartbeat_buffer.pop(key)) for key in list(_heartbeat_buffer) if key[0] in session_ids]
+    if not pending:
+        return 0
+
+    conn = get_db()
+    try:
+        with conn:
+            # The last_heartbeat guard keeps an older, late flush from overwriting a newer value,
+            # and the user_id guard keeps a token from keeping someone else's session alive.
+            conn.executemany(
+                'UPDATE sessions SET last_heartbeat = ? WHERE id = ? AND user_id = ? AND status = "active" AND last_heartbeat < ?',
+                [(timestamp, session_id, user_id, timestamp) for (session_id, user_id), timestamp in pending]
+            )
+    except sqlite3.Error:
+        # Put them back for the next flush, unless a newer heartbeat has arrived meanwhile.
+        with _heartbeat_lock:
+            for key, timestamp in pending:
+                current = _heartbeat_buffer.get(key)
+                if current is None or timestamp > current:
+                    _heartbeat_buffer[key] = timestamp
+        raise
+    finally:
+        conn.close()
+    return len(pending)
+
+def _heartbeat_flush_loop():
+    while not _heartbeat_stop_event.wait(HEARTBEAT_FLUSH_INTERVAL):
+        try:
+            flush_heartbeats()
+        except sqlite3.Error as e:
+            print(f"Heartbeat flush failed: {e}")
+
+def _start_heartbeat_flusher():
+    global _heartbeat_flusher
+    if _heartbeat_flusher is None or not _heartbeat_flusher.is_alive():
+        with _heartbeat_lock:
+            if _heartbeat_flusher is None or not _heartbeat_flusher.is_alive():
+                _heartbeat_stop_event.clear()
+                _heartbeat_flusher = threading.Thread(target=_heartbeat_flush_loop, daemon=True)
+                _heartbeat_flusher.start()
+
+def stop_heartbeat_flusher():
+    """Stops the background flusher and writes anything still buffered."""
+    _heartbeat_stop_event.set()
+    if _heartbeat_flusher is not None and _heartbeat_flusher.is_alive():
+        _heartbeat_flusher.join(timeout=5)
+    flush_heartbeats()
+
+
+def coerce_session_id(value):
+    """Normalises a session_id from a JSON payload so buffer keys match."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+# Daily Rollups
+# daily_rollups holds summed minutes and session counts per
+# (day, user_id, app_name, task_id). task_id 0 stands for "no task".
+ROLLUP_UPSERT = """
+    INSERT INTO daily_rollups (day, user_id, app_name, task_id, total_duration, session_count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, user_id, app_name, task_id) DO UPDATE SET
+        total_duration = total_duration + excluded.total_duration,
+        session_count = session_count + excluded.session_count
+"""
+
+def add_to_rollup(conn, day, user_id, app_name, task_id, duration, session_count):
+    """Adds a session's minutes to its rollup row. Runs inside the caller's transaction."""
+    conn.execute(ROLLUP_UPSERT, (day, user_id, app_name, task_id or 0, duration, session_count))
+
+def rebuild_daily_rollups(conn):
+    """Recomputes daily_rollups from every stopped session."""
+    with conn:
+        conn.execute("DELETE FROM daily_rollups")
+        conn.execute("""
+            INSERT INTO daily_rollups (day, user_id, app_name, task_id, total_duration, session_count)
+            SELECT start_day, user_id, app_name, COALESCE(task_id, 0), SUM(duration), COUNT(*)
+            FROM sessions
+            WHERE status = 'stopped' AND duration IS NOT NULL
+            GROUP BY start_day, user_id, app_name, COALESCE(task_id, 0)
+        """)
+
+def session_filters(start_date, end_date, artist_username):
+    """Builds the WHERE clause for stopped sessions shared by the dashboard and exports."""
+    clauses, params = ["s.status = 'stopped'", "s.duration IS NOT NULL"], []
+    if start_date:
+        clauses.append("s.start_day >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("s.start_day <= ?")
+        params.append(end_date)
+    if artist_username:
+        clauses.append("u.username = ?")
+        params.append(artist_username)
+    return "WHERE " + " AND ".join(clauses), params
+
+def rollup_filters(start_date, end_date, artist_username):
+    """Builds the WHERE clause shared by the dashboard's rollup queries."""
+    clauses, params = [], []
+    if start_date:
+        clauses.append("r.day >= ?")
+        params.append(start_date)
+    if end_date:
+        clauses.append("r.day <= ?")
+        params.append(end_date)
+    if artist_username:
+        clauses.append("u.username = ?")
+        params.append(artist_username)
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+# Dashboard Cache
+# dashboard_stats responses are kept in a small LRU keyed on the filters.
+# Every change to stopped sessions bumps a data version and records the day
+# it touched, so an entry is only dropped when a change falls inside its range.
+# Ranges that ended before today rarely change and are kept much longer.
+DASHBOARD_CACHE_SIZE = 128
+DASHBOARD_CACHE_TTL = 60  # seconds, for ranges that include today
+DASHBOARD_CLOSED_RANGE_TTL = 6 * 60 * 60  # seconds, for ranges that ended before today
+_dashboard_cache = OrderedDict()
+_dashboard_cache_lock = threading.Lock()
+_dashboard_cache_counters = {"hits": 0, "misses": 0}
+_dashboard_data_version = 0
+_dashboard_changed_days = {}  # day -> data version of its latest change
+
+def invalidate_dashboard_cache(day):
+    """Called whenever a stopped session on `day` is written."""
+    global _dashboard_data_version
+    with _dashboard_cache_lock:
+        _dashboard_data_version += 1
+        _dashboard_changed_days[day] = _dashboard_data_version
+        if len(_dashboard_changed_days) > 4 * DASHBOARD_CACHE_SIZE:
+            # Changes older than every cached entry can no longer invalidate anything.
+            oldest = min((entry['version'] for entry in _dashboard_cache.values()),
+                         default=_dashboard_data_version)
+            for changed_day, version in list(_dashboard_changed_days.items()):
+                if version <= oldest:
+                    del _dashboard_changed_days[changed_day]
+
+def _dashboard_entry_is_fresh(key, entry):
+    if time.monotonic() > entry['expires']:
+        return False
+    if entry['version'] == _dashboard_data_version:
+        return True
+    start_date, end_date = entry['watch_range']
+    for day, version in _dashboard_changed_days.items():
+        if version > entry['version'] and (not start_date or day is None or day >= start_date) \
+                and (not end_date or day is None or day <= end_date):
+            return False
+    return True
+
+def dashboard_cache_get(key):
+    with _dashboard_cache_lock:
+        entry = _dashboard_cache.get(key)
+        if entry is not None and _dashboard_entry_is_fresh(key, entry):
+            _dashboard_cache.move_to_end(key)
+            _dashboard_cache_counters['hits'] += 1
+            return entry['stats']
+        if entry is not None:
+            del _dashboard_cache[key]
+        _dashboard_cache_counters['misses'] += 1
+        return None
+
+def dashboard_cache_put(key, stats, version, watch_range=None):
+    """
+    Caches `stats` under `key`, whose first two items are its start and end date.
+    Changes to days in `watch_range` (start, end) drop the entry; it defaults to the key's own range.
+    """
+    end_date = key[1]
+    closed = bool(end_date) and end_date < datetime.utcnow().date().isoformat()
+    ttl = DASHBOARD_CLOSED_RANGE_TTL if closed else DASHBOARD_CACHE_TTL
+    with _dashboard_cache_lock:
+        _dashboard_cache[key] = {"stats": stats, "version": version, "expires": time.monotonic() + ttl,
+                                 "watch_range": watch_range or (key[0], key[1])}
+        _dashboard_cache.move_to_end(key)
+        while len(_dashboard_cache) > DASHBOARD_CACHE_SIZE:
+            _dashboard_cache.popitem(last=False)
+
+# Auth Tokens
+# /api/login hands out a signed, expiring bearer token ("<user_id>.<expires>.<hmac>").
+# Session endpoints check it with one HMAC instead of a password hash or a
+# users lookup, and DCCs keep it on disk so a restart doesn't log in again.
+TOKEN_TTL = 30 * 24 * 60 * 60  # seconds
+TOKEN_SECRET_FILE = "token_secret.key"  # used when VFX_TRACKER_SECRET isn't set
+_token_secret = None
+_token_secret_lock = threading.Lock()
+
+def token_secret():
+    """
+    The token signing key: VFX_TRACKER_SECRET, or a random key kept in
+    TOKEN_SECRET_FILE so tokens survive restarts. run.py loads it before
+    forking workers so every worker signs with the same key.
+    """
+    global _token_secret
+    if _token_secret is None:
+        with _token_secret_lock:
+            if _token_secret is None:
+                secret = os.environ.get("VFX_TRACKER_SECRET", "").encode()
+                if not secret:
+                    try:
+                        with open(TOKEN_SECRET_FILE, "rb") as f:
+                            secret = f.read()
+                    except FileNotFoundError:
+                        secret = secrets.token_bytes(32)
+                        with open(os.open(TOKEN_SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+                            f.write(secret)
+                _token_secret = secret
+    return _token_secret
+
+def _sign(message):
+    digest = hmac.new(token_secret(), message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def issue_token(user_id, now=None):
+    """Returns (token, expires_at) for a user, expires_at in epoch seconds."""
+    expires_at = int(now or time.time()) + TOKEN_TTL
+    message = f"{user_id}.{expires_at}"
+    return f"{message}.{_sign(message)}", expires_at
+
+def verify_token(token):
+    """Returns the token's user_id, or None if it is malformed, forged or expired."""
+    try:
+        user_id, expires_at, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(f"{user_id}.{expires_at}")) or int(expires_at) < time.time():
+            return None
+        return int(user_id)
+    except (AttributeError, ValueError):
+        return None
+
+def require_token(view):
+    """Rejects requests without a valid bearer token and puts its user in g.user_id."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        user_id = verify_token(token) if scheme.lower() == 'bearer' else None
+        if user_id is None:
+            return jsonify({"status": "error", "message": "A valid login token is required."}), 401
+        g.user_id = user_id
+        return view(*args, **kwargs)
+    return wrapper
+
+def is_token_user(user_id):
+    """True if a user_id sent in a payload is the token's own user."""
+    return coerce_session_id(user_id) == g.user_id
+
+# Session Lifecycle
+# Shared by the per-call session endpoints and the bulk /api/session/sync
+# endpoint. Each helper runs inside the caller's transaction.
+SYNC_EVENT_TYPES = ('start', 'heartbeat', 'pause', 'resume', 'stop')
+
+def create_session_row(conn, data, at, client_key=None):
+    """Inserts a new active session and returns its id."""
+    cursor = conn.execute(
+        "INSERT INTO sessions (user_id, task_id, app_name, session_name, scene_path, start_time, start_day, last_heartbeat, client_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (data.get('user_id'), data.get('task_id'), data.get('dcc_name'), data.get('project_name'), data.get('scene_name'),
+         at, at.date().isoformat(), at, client_key)
+    )
+    return cursor.lastrowid
+
+def pause_session_row(conn, session_id, user_id, at):
+    conn.execute('UPDATE sessions SET status = "paused", last_heartbeat = ? WHERE id = ? AND user_id = ? AND status = "active"',
+                 (at, session_id, user_id))
+
+def resume_session_row(conn, session_id, user_id, at):
+    """Adds the time since the pause to paused_duration. Returns False if the user has no such paused session."""
+    session = conn.execute('SELECT last_heartbeat, paused_duration FROM sessions WHERE id = ? AND user_id = ? AND status = "paused"',
+                           (session_id, user_id)).fetchone()
+    if not session:
+        return False
+
+    pause_start_time = datetime.fromisoformat(session['last_heartbeat'])
+    pause_duration_seconds = max((at - pause_start_time).total_seconds(), 0)
+    
+    new_total_paused_duration = (session['paused_duration'] or 0) + (pause_duration_seconds / 60)
+
+    conn.execute('UPDATE sessions SET status = "active", last_heartbeat = ?, paused_duration = ? WHERE id = ?',
+                 (at, new_total_paused_duration, session_id))
+    return True
+
+def stop_session_row(conn, session_id, user_id, at):
+    """
+    Closes a session at `at` and adds it to the daily rollups.
+    Returns the session's start_day, or None if the session doesn't exist
+    or belongs to another user.
+    A session that is already stopped (for example by the stale session
+    reaper) keeps the duration it was closed with.
+    """
+    session = conn.execute('SELECT user_id, task_id, app_name, start_time, start_day, paused_duration, status FROM sessions WHERE id = ?',
+                           (session_id,)).fetchone()
+    if not session or session['user_id'] != user_id:
+        return None
+    if session['status'] == 'stopped':
+        return session['start_day']
+    
+    start_time = datetime.fromisoformat(session['start_time'])
+    total_paused_duration_minutes = session['paused_duration'] or 0
+    
+    total_duration_minutes = (at - start_time).total_seconds() / 60
+    active_duration = round(total_duration_minutes - total_paused_duration_minutes, 2)
+    
+    conn.execute('UPDATE sessions SET end_time = ?, duration = ?, status = "stopped" WHERE id = ?',
+                 (at, active_duration, session_id))
+    add_to_rollup(conn, session['start_day'], session['user_id'], session['app_name'], session['task_id'],
+                  active_duration, 1)
+    return session['start_day']
+
+def continue_reaped_session_row(conn, session_id, user_id, event_type, at):
+    """
+    Applies a heartbeat or resume that arrives after the reaper closed the
+    session, e.g. from a client that was offline or asleep.
+    A heartbeat within STALE_ACTIVE_TIMEOUT of the session's end continues
+    the same stretch of work, so the end moves out to it and the minutes go
+    to the session and its rollup. A resume, or a heartbeat after a longer
+    gap, starts a new session from `at` under the same client key, so the
+    idle gap is never counted. Pauses and stops change nothing.
+    Returns (session_id to use from now on, start_day changed or None).
+    """
+    session = conn.execute('SELECT task_id, app_name, session_name, scene_path, start_day, end_time, client_key FROM sessions WHERE id = ? AND user_id = ? AND status = "stopped"',
+                           (session_id, user_id)).fetchone()
+    if not session or not session['end_time'] or event_type not in ('heartbeat', 'resume'):
+        return session_id, None
+    gap_seconds = (at - datetime.fromisoformat(session['end_time'])).total_seconds()
+    if gap_seconds <= 0:
+        return session_id, None
+
+    if event_type == 'heartbeat' and gap_seconds <= STALE_ACTIVE_TIMEOUT:
+        extra_duration = round(gap_seconds / 60, 2)
+        conn.execute('UPDATE sessions SET end_time = ?, duration = duration + ? WHERE id = ?',
+                     (at, extra_duration, session_id))
+        add_to_rollup(conn, session['start_day'], user_id, session['app_name'], session['task_id'], extra_duration, 0)
+        return session_id, session['start_day']
+
+    conn.execute('UPDATE sessions SET client_key = NULL WHERE id = ?', (session_id,))
+    new_session_id = create_session_row(conn, {
+        "user_id": user_id, "task_id": session['task_id'], "dcc_name": session['app_name'],
+        "project_name": session['session_name'], "scene_name": session['scene_path'],
+    }, at, client_key=session['client_key'])
+    return new_session_id, None
+
+# Stale Session Reaper
+# Sessions whose DCC crashed or lost power never get a stop. The reaper closes
+# them with their duration counted up to the last heartbeat. Active sessions
+# normally heartbeat or get paused by the client within minutes, so they go
+# stale quickly. Paused sessions can legitimately sit for hours.
+REAPER_INTERVAL = 300  # seconds between runs
+STALE_ACTIVE_TIMEOUT = 30 * 60  # seconds without a heartbeat before an active session is closed
+STALE_PAUSED_TIMEOUT = 12 * 60 * 60  # seconds before a paused session is closed
+# Sync event keys only need to outlive the oldest spool a client could still replay.
+# Replaying an older key is harmless anyway: its session was reaped long ago, and
+# pauses, resumes and stops of a stopped session change nothing.
+INGESTED_EVENT_RETENTION = 90 * 24 * 60 * 60  # seconds
+_reaper_thread = None
+_reaper_stop_event = threading.Event()
+_reaper_stats = {"runs": 0, "last_run_at": None, "last_run_ms": 0.0, "last_closed": 0, "total_closed": 0}
+_reaper_metrics = {"duration": LatencyHistogram(), "finished_at": 0.0}  # finished_at is Unix time, 0 until the first run
+
+STALE_SESSIONS_WHERE = """
+    (status = 'active' AND last_heartbeat < :active_cutoff)
+    OR (status = 'paused' AND last_heartbeat < :paused_cutoff)
+"""
+STALE_DURATION = "ROUND(MAX((julianday(last_heartbeat) - julianday(start_time)) * 1440 - COALESCE(paused_duration, 0), 0), 2)"
+
+def reap_stale_sessions(now=None):
+    """
+    Closes every stale session in one transaction and prunes sync event keys
+    older than INGESTED_EVENT_RETENTION. Returns how many sessions were closed.
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    # Buffered heartbeats may be all that keeps a session from looking stale.
+    flush_heartbeats()
+    params = {
+        "active_cutoff": now - timedelta(seconds=STALE_ACTIVE_TIMEOUT),
+        "paused_cutoff": now - timedelta(seconds=STALE_PAUSED_TIMEOUT),
+    }
+
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        days = [row[0] for row in conn.execute(f"SELECT DISTINCT start_day FROM sessions WHERE {STALE_SESSIONS_WHERE}", params)]
+        if days:
+            conn.execute(f"""
+                INSERT INTO daily_rollups (day, user_id, app_name, task_id, total_duration, session_count)
+                SELECT start_day, user_id, app_name, COALESCE(task_id, 0), SUM({STALE_DURATION}), COUNT(*)
+                FROM sessions
+                WHERE {STALE_SESSIONS_WHERE}
+                GROUP BY start_day, user_id, app_name, COALESCE(task_id, 0)
+                ON CONFLICT (day, user_id, app_name, task_id) DO UPDATE SET
+                    total_duration = total_duration + excluded.total_duration,
+                    session_count = session_count + excluded.session_count
+            """, params)
+            closed = conn.execute(f"""
+                UPDATE sessions
+                SET status = 'stopped', end_time = last_heartbeat, duration = {STALE_DURATION}
+                WHERE {STALE_SESSIONS_WHERE}
+            """, params).rowcount
+        else:
+            closed = 0
+        conn.execute('DELETE FROM ingested_events WHERE received_at < ?',
+                     (now - timedelta(seconds=INGESTED_EVENT_RETENTION),))
+        conn.commit()
+    finally:
+        conn.close()
+
+    for day in days:
+        invalidate_dashboard_cache(day)
+    _reaper_stats["runs"] += 1
+    _reaper_stats["last_run_at"] = now.isoformat()
+    elapsed = time.perf_counter() - started
+    _reaper_stats["last_run_ms"] = elapsed * 1000
+    _reaper_stats["last_closed"] = closed
+    _reaper_stats["total_closed"] += closed
+    with _metrics_lock:
+        _reaper_metrics["duration"].observe(elapsed)
+        _reaper_metrics["finished_at"] = time.time()
+    if closed:
+        print(f"Reaper closed {closed} stale session(s).")
+    return closed
+
+def _reaper_loop():
+    while not _reaper_stop_event.wait(REAPER_INTERVAL):
+        try:
+            reap_stale_sessions()
+        except sqlite3.Error as e:
+            print(f"Stale session reaper failed: {e}")
+
+def start_session_reaper():
+    """Starts the background thread that periodically closes stale sessions."""
+    global _reaper_thread
+    if _reaper_thread is None or not _reaper_thread.is_alive():
+        _reaper_stop_event.clear()
+        _reaper_thread = threading.Thread(target=_reaper_loop, daemon=True)
+        _reaper_thread.start()
+
+def stop_session_reaper():
+    _reaper_stop_event.set()
+    if _reaper_thread is not None and _reaper_thread.is_alive():
+        _reaper_thread.join(timeout=5)
+
+def shutdown():
+    """Flushes buffered writes and closes pooled connections. Safe to call twice."""
+    stop_session_reaper()
+    stop_heartbeat_flusher()
+    close_db_pool()
+
+atexit.register(shutdown)
+
+# Responses
+# JSON is encoded with orjson when it's installed, falling back to the stdlib
+# encoder. Bodies above COMPRESS_MIN_SIZE are compressed with brotli or gzip,
+# whichever the client accepts. Tabular endpoints also accept
+# ?layout=columnar, which returns {column: [values]} instead of a list of
+# records, so repeated keys (and usernames or app names) don't bloat the body.
+COMPRESS_MIN_SIZE = 1024  # bytes
+COMPRESS_MIMETYPES = ('application/json', 'text/html')
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0  # dates are encoded like Flask does
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when it can."""
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+            except TypeError:
+                pass  # e.g. integers over 64 bits
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):  # pretty-printed
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+app.json = FastJSONProvider(app)
+
+def wants_columnar():
+    return request.args.get('layout') == 'columnar'
+
+def tabular(rows):
+    """Rows (sqlite3.Row or dicts) as a list of records, or as {column: [values]} for ?layout=columnar."""
+    if not wants_columnar():
+        return [dict(row) for row in rows]
+    if not rows:
+        return {}
+    return {column: [row[column] for row in rows] for column in rows[0].keys()}
+
+def response_encoding():
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def conditional_json(payload):
+    """
+    Returns a JSON response with an ETag over its body. A request whose
+    If-None-Match matches gets an empty 304 instead of the list again.
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route pattern, not the URL, so /api/... query strings don't each get a series.
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Registered after the metrics hook, so it runs first and its time is counted in the request duration."""
+    if response.direct_passthrough or response.is_streamed or response.status_code in (204, 304) \
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = response_encoding() if len(body) >= COMPRESS_MIN_SIZE else None
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    # The ETag was taken over the uncompressed body; If-None-Match compares weakly.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+#  Web Page Route 
+@app.route('/dashboard')
+def dashboard():
+    """Serves the main manager dashboard web page."""
+    return render_template('index.html')
+
+
+#  API Endpoints 
+
+@app.route('/api/users', methods=['GET'])
+def get_users():
+    conn = get_db()
+    rows = conn.execute("SELECT id, username FROM users ORDER BY username").fetchall()
+    conn.close()
+    users = tabular(rows)
+    return conditional_json({"status": "success", "users": users})
+
+@app.route('/api/tasks', methods=['GET'])
+def get_tasks():
+    conn = get_db()
+    rows = conn.execute("SELECT id, task_name FROM tasks ORDER BY task_name").fetchall()
+    conn.close()
+    tasks = tabular(rows)
+    return conditional_json({"status": "success", "tasks": tasks})
+
+
+@app.route('/api/dashboard_stats', methods=['GET'])
+def dashboard_stats():
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    artist_username = request.args.get('artist')
+    include_export = request.args.get('include_export', '').lower() in ('1', 'true', 'yes')
+
+    if include_export:
+        stats = compute_dashboard_stats(start_date, end_date, artist_username, include_export=True)
+        return jsonify({"status": "success", "stats": columnar_stats(stats)})
+
+    key = (start_date, end_date, artist_username)
+    stats = dashboard_cache_get(key)
+    if stats is None:
+        # Read the version first so a stop landing mid-query leaves this entry stale.
+        version = _dashboard_data_version
+        stats = compute_dashboard_stats(start_date, end_date, artist_username)
+        dashboard_cache_put(key, stats, version)
+    return jsonify({"status": "success", "stats": columnar_stats(stats)})
+
+def columnar_stats(stats):
+    """Applies ?layout=columnar to the record lists in dashboard stats. The cached stats are left untouched."""
+    if not wants_columnar():
+        return stats
+    return {name: tabular(value) if isinstance(value, list) else value for name, value in stats.items()}
+
+@app.route('/api/dashboard_cache_stats', methods=['GET'])
+def dashboard_cache_stats():
+    """Reports hit rate and size of the dashboard stats cache."""
+    with _dashboard_cache_lock:
+        lookups = _dashboard_cache_counters['hits'] + _dashboard_cache_counters['misses']
+        cache_stats = {
+            "size": len(_dashboard_cache), "max_size": DASHBOARD_CACHE_SIZE,
+            "hits": _dashboard_cache_counters['hits'], "misses": _dashboard_cache_counters['misses'],
+            "hit_rate": _dashboard_cache_counters['hits'] / lookups if lookups else 0.0,
+            "data_version": _dashboard_data_version
+        }
+    return jsonify({"status": "success", "cache": cache_stats})
+
+def compute_dashboard_stats(start_date, end_date, artist_username, include_export=False):
+    """Runs the dashboard queries for a date range and optional artist."""
+    conn = get_db()
+    
+    session_where, params = session_filters(start_date, end_date, artist_username)
+    base_query = f"""
+        SELECT u.username, s.app_name, s.duration, t.task_name, s.session_name, s.end_time
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        LEFT JOIN tasks t ON s.task_id = t.id
+        {session_where}
+    """
+
+    # Totals and breakdowns come from the daily rollups, so their cost scales
+    # with the number of days in the range rather than the number of sessions.
+    rollup_where, rollup_params = rollup_filters(start_date, end_date, artist_username)
+    rollup_from = "FROM daily_rollups r JOIN users u ON r.user_id = u.id LEFT JOIN tasks t ON r.task_id = t.id"
+
+    def breakdown(column, alias):
+        rows = conn.execute(f"""
+            SELECT {column} AS {alias}, SUM(r.total_duration) / 60.0 AS total_duration
+            {rollup_from} {rollup_where}
+            GROUP BY {column} ORDER BY total_duration DESC
+        """, rollup_params).fetchall()
+        return [dict(row) for row in rows]
+
+    hours_per_artist = breakdown("u.username", "username")
+    if not hours_per_artist:
+        conn.close()
+        return {
+            "total_hours": 0, "top_artist": "N/A", "hours_per_artist": [],
+            "hours_per_app": [], "hours_per_task": [], "recent_sessions": [],
+            "all_sessions_for_export": []
+        }
+
+    total_minutes = conn.execute(f"SELECT COALESCE(SUM(r.total_duration), 0) {rollup_from} {rollup_where}",
+                                 rollup_params).fetchone()[0]
+    hours_per_app = breakdown("r.app_name", "app_name")
+    hours_per_task = breakdown("t.task_name", "task_name")
+    recent_sessions = conn.execute(base_query + " ORDER BY s.end_time DESC LIMIT 5", params).fetchall()
+    # Export rows are large for long ranges; /api/export/sessions streams them instead.
+    all_sessions = conn.execute(base_query, params).fetchall() if include_export else []
+    conn.close()
+
+    return {
+        "total_hours": total_minutes / 60, "top_artist": hours_per_artist[0]['username'],
+        "hours_per_artist": hours_per_artist,
+        "hours_per_app": hours_per_app,
+        "hours_per_task": hours_per_task,
+        "recent_sessions": [dict(row) for row in recent_sessions],
+        "all_sessions_for_export": [dict(row) for row in all_sessions]
+    }
+
+
+# Time Series
+# Hours per day/week/month bucket, optionally split by artist, app or task.
+# Totals come from daily_rollups, grouped by day and raw key (no joins), and
+# are put into buckets in Python. Rollups count a whole session on its start
+# day, so sessions that run past midnight are then moved out of their start
+# bucket and spread over the days they cover, in proportion to wall-clock
+# time. The partial index idx_sessions_overnight keeps finding them cheap.
+TIMESERIES_INTERVALS = ('day', 'week', 'month')
+TIMESERIES_SPLITS = {'artist': 'user_id', 'app': 'app_name', 'task': 'task_id'}  # column in rollups and sessions
+TIMESERIES_MAX_BUCKETS = 1000
+TIMESERIES_MAX_SERIES = 10  # further series are summed into "Other"
+
+def bucket_start(day, interval):
+    """First day of the bucket holding `day`. Weeks start on Monday."""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+def timeseries_buckets(start, end, interval):
+    buckets = []
+    day = bucket_start(start, interval)
+    while day <= end:
+        buckets.append(day.isoformat())
+        if interval == 'month':
+            day = (day + timedelta(days=32)).replace(day=1)
+        else:
+            day += timedelta(days=7 if interval == 'week' else 1)
+    return buckets
+
+@app.route('/api/timeseries', methods=['GET'])
+def timeseries():
+    """
+    Returns hours per bucket from start_date to end_date (inclusive) as
+    {"buckets": [...], "series": [{"name": ..., "hours": [...]}]}, so the
+    payload grows with the number of buckets, not sessions. interval is
+    day, week or month (default week); split_by is artist, app or task.
+    Weeks start on Monday, and the first and last buckets may be partial.
+    """
+    interval = request.args.get('interval', 'week')
+    split_by = request.args.get('split_by') or None
+    artist_username = request.args.get('artist') or None
+    if interval not in TIMESERIES_INTERVALS:
+        return jsonify({"status": "error", "message": "interval must be 'day', 'week' or 'month'."}), 400
+    if split_by is not None and split_by not in TIMESERIES_SPLITS:
+        return jsonify({"status": "error", "message": "split_by must be 'artist', 'app' or 'task'."}), 400
+    try:
+        limit = int(request.args.get('limit', TIMESERIES_MAX_SERIES))
+        end = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') \
+            else datetime.utcnow().date()
+        start = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') \
+            else first_tracked_day(end)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Dates must be YYYY-MM-DD and limit a number."}), 400
+    if start > end:
+        return jsonify({"status": "error", "message": "start_date must not be after end_date."}), 400
+    buckets = timeseries_buckets(start, end, interval)
+    if len(buckets) > TIMESERIES_MAX_BUCKETS:
+        return jsonify({"status": "error",
+                        "message": f"That is {len(buckets)} buckets; use a longer interval or a shorter range (max {TIMESERIES_MAX_BUCKETS})."}), 400
+
+    key = (start.isoformat(), end.isoformat(), artist_username, 'timeseries', interval, split_by, limit)
+    series = dashboard_cache_get(key)
+    if series is None:
+        version = _dashboard_data_version
+        series = compute_timeseries(start, end, artist_username, interval, split_by, limit, buckets)
+        # A session stopped late can start before the range and still add to it.
+        dashboard_cache_put(key, series, version, watch_range=(None, end.isoformat()))
+    return jsonify({"status": "success", "start_date": start.isoformat(), "end_date": end.isoformat(),
+                    "interval": interval, "split_by": split_by, "buckets": buckets, "series": series})
+
+def first_tracked_day(end):
+    conn = get_db()
+    first_day = conn.execute("SELECT MIN(day) FROM daily_rollups").fetchone()[0]
+    conn.close()
+    return min(datetime.strptime(first_day, '%Y-%m-%d').date(), end) if first_day else end
+
+def compute_timeseries(start, end, artist_username, interval, split_by, limit, buckets):
+    conn = get_db()
+    column = TIMESERIES_SPLITS[split_by] if split_by else "NULL"
+    filters, params = "", []
+    if artist_username:
+        filters = "AND user_id = (SELECT id FROM users WHERE username = ?)"
+        params.append(artist_username)
+    rows = conn.execute(f"""
+        SELECT day, {column} AS series_key, SUM(total_duration) FROM daily_rollups
+        WHERE day BETWEEN ? AND ? {filters}
+        GROUP BY day, series_key
+    """, [start.isoformat(), end.isoformat()] + params).fetchall()
+    # Sessions past midnight. The planner can't tell how selective the partial index is, so it is named.
+    overnight = conn.execute(f"""
+        SELECT start_time, end_time, start_day, duration, {column} AS series_key
+        FROM sessions INDEXED BY idx_sessions_overnight
+        WHERE status = 'stopped' AND end_time >= date(start_day, '+1 day')
+          AND start_day <= ? AND date(end_time) >= ? AND duration IS NOT NULL {filters}
+    """, [end.isoformat(), start.isoformat()] + params).fetchall()
+    if split_by == 'artist':
+        names = dict(conn.execute("SELECT id, username FROM users").fetchall())
+    elif split_by == 'task':
+        names = dict(conn.execute("SELECT id, task_name FROM tasks").fetchall())
+    else:
+        names = None
+    conn.close()
+
+    buckets_by_day = {}
+    def bucket_of(day):
+        if day not in buckets_by_day:
+            buckets_by_day[day] = bucket_start(datetime.strptime(day, '%Y-%m-%d').date(), interval).isoformat()
+        return buckets_by_day[day]
+
+    totals = {}  # (bucket, series key) -> minutes
+    for day, series_key, minutes in rows:
+        key = (bucket_of(day), series_key)
+        totals[key] = totals.get(key, 0) + minutes
+    for row in overnight:
+        split_session(totals, row, start, end, interval)
+
+    by_series = {}
+    for (bucket, series_key), minutes in totals.items():
+        # Rollups store "no task" as task_id 0, sessions as NULL
+        name = names.get(series_key) if names is not None else series_key
+        series = by_series.setdefault(name, {})
+        series[bucket] = series.get(bucket, 0) + minutes
+    ranked = sorted(by_series.items(), key=lambda item: sum(item[1].values()), reverse=True)
+    if len(ranked) > limit > 0:
+        other = {}
+        for _, minutes_by_bucket in ranked[limit:]:
+            for bucket, minutes in minutes_by_bucket.items():
+                other[bucket] = other.get(bucket, 0) + minutes
+        ranked = ranked[:limit] + [("Other", other)]
+    return [{"name": name if split_by else "All",
+             "hours": [round(minutes_by_bucket.get(bucket, 0) / 60, 2) for bucket in buckets]}
+            for name, minutes_by_bucket in ranked]
+
+def split_session(totals, row, start, end, interval):
+    """Moves an overnight session's minutes from its start bucket to each day it covers, by wall-clock share."""
+    session_start = datetime.fromisoformat(row['start_time'])
+    session_end = datetime.fromisoformat(row['end_time'])
+    wall_seconds = (session_end - session_start).total_seconds()
+    if wall_seconds <= 0:
+        return
+    series_key = row['series_key']
+    start_day = datetime.strptime(row['start_day'], '%Y-%m-%d').date()
+    if start <= start_day <= end:
+        key = (bucket_start(start_day, interval).isoformat(), series_key)
+        totals[key] = totals.get(key, 0) - row['duration']
+    cursor = session_start
+    while cursor < session_end:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time())
+        piece_end = min(next_midnight, session_end)
+        if start <= cursor.date() <= end:
+            key = (bucket_start(cursor.date(), interval).isoformat(), series_key)
+            totals[key] = totals.get(key, 0) + row['duration'] * (piece_end - cursor).total_seconds() / wall_seconds
+        cursor = piece_end
+
+EXPORT_COLUMNS = ('username', 'task_name', 'app_name', 'session_name', 'duration', 'start_time', 'end_time')
+EXPORT_CHUNK_SIZE = 1000
+
+@app.route('/api/export/sessions', methods=['GET'])
+def export_sessions():
+    """
+    Streams stopped sessions as CSV (default), NDJSON, Parquet or Arrow,
+    using the same start_date/end_date/artist filters as the dashboard.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format in COLUMNAR_EXPORT_FORMATS:
+        return export_sessions_columnar(export_format)
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({"status": "error", "message": "format must be 'csv', 'ndjson', 'parquet' or 'arrow'."}), 400
+
+    session_where, params = session_filters(request.args.get('start_date'), request.args.get('end_date'),
+                                            request.args.get('artist'))
+    query = f"""
+        SELECT u.username, t.task_name, s.app_name, s.session_name, s.duration, s.start_time, s.end_time
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        LEFT JOIN tasks t ON s.task_id = t.id
+        {session_where}
+        ORDER BY s.start_time
+    """
+
+    def generate():
+        conn = get_db()
+        try:
+            cursor = conn.execute(query, params)
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv':
+                writer.writerow(EXPORT_COLUMNS)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                if export_format == 'csv':
+                    writer.writerows(tuple(row) for row in rows)
+                else:
+                    buffer.writelines(app.json.dumps(dict(row)) + "\n" for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            conn.close()
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"time_tracker_export_{datetime.utcnow().date().isoformat()}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+# Columnar Export
+# Sessions joined with users and tasks as Parquet or an Arrow IPC file, for
+# BI notebooks. Rows are read from one cursor in batches of
+# COLUMNAR_BATCH_SIZE and written out batch by batch, so memory stays flat
+# however long the range. username, task_name and app_name are dictionary
+# encoded against dictionaries built once up front, since an Arrow file can't
+# change a dictionary between batches. Times are UTC timestamps. pyarrow is
+# optional; without it these formats return 501.
+COLUMNAR_EXPORT_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+COLUMNAR_BATCH_SIZE = 16384  # rows per record batch and Parquet row group; bounds export memory
+COLUMNAR_COMPRESSION = 'zstd'
+
+def import_pyarrow():
+    """Returns (pyarrow, pyarrow.parquet), or None if pyarrow isn't installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+class ChunkSink:
+    """Write-only file object that collects what pyarrow writes until it is drained into a response."""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def write_sessions_columnar(sink, export_format, start_date=None, end_date=None, artist_username=None,
+                            batch_size=COLUMNAR_BATCH_SIZE):
+    """
+    Writes stopped sessions to `sink` (a path or file object) as Parquet or an
+    Arrow IPC file. This is a generator: it yields the running row count after
+    every batch, so the caller can stream out what has been written so far.
+    """
+    pa, pq = import_pyarrow()
+    strings = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([
+        ('session_id', pa.int64()), ('username', strings), ('task_name', strings), ('app_name', strings),
+        ('session_name', pa.string()), ('start_day', pa.date32()),
+        ('start_time', pa.timestamp('us', tz='UTC')), ('end_time', pa.timestamp('us', tz='UTC')),
+        ('duration', pa.float64()), ('paused_duration', pa.float64()),
+    ])
+    session_where, params = session_filters(start_date, end_date, artist_username)
+
+    conn = get_db()
+    try:
+        # One read transaction, so the dictionaries match every row the cursor returns.
+        conn.execute("BEGIN")
+        users = conn.execute("SELECT id, username FROM users ORDER BY id").fetchall()
+        tasks = conn.execute("SELECT id, task_name FROM tasks ORDER BY id").fetchall()
+        # Read from the sessions being exported, not daily_rollups, which may lag behind them.
+        apps = [row[0] for row in conn.execute(f"""
+            SELECT DISTINCT s.app_name
+            FROM sessions s
+            JOIN users u ON s.user_id = u.id
+            {session_where}
+            ORDER BY s.app_name
+        """, params)]
+        user_index = {row['id']: i for i, row in enumerate(users)}
+        task_index = {row['id']: i for i, row in enumerate(tasks)}
+        app_index = {app_name: i for i, app_name in enumerate(apps)}
+        dictionaries = (pa.array([row['username'] for row in users], pa.string()),
+                        pa.array([row['task_name'] for row in tasks], pa.string()),
+                        pa.array(apps, pa.string()))
+
+        cursor = conn.execute(f"""
+            SELECT s.id, s.user_id, s.task_id, s.app_name, s.session_name, s.start_day, s.start_time, s.end_time,
+                   s.duration, s.paused_duration
+            FROM sessions s
+            JOIN users u ON s.user_id = u.id
+            {session_where}
+            ORDER BY s.start_day, s.start_time
+        """, params)
+
+        if export_format == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression=COLUMNAR_COMPRESSION)
+        else:
+            writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+        written = 0
+        with writer:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                writer.write_batch(pa.record_batch([
+                    pa.array(columns[0], pa.int64()),
+                    pa.DictionaryArray.from_arrays(pa.array([user_index.get(i) for i in columns[1]], pa.int32()), dictionaries[0]),
+                    pa.DictionaryArray.from_arrays(pa.array([task_index.get(i) for i in columns[2]], pa.int32()), dictionaries[1]),
+                    pa.DictionaryArray.from_arrays(pa.array([app_index[a] for a in columns[3]], pa.int32()), dictionaries[2]),
+                    pa.array(columns[4], pa.string()),
+                    pa.array(columns[5], pa.string()).cast(pa.date32()),
+                    pa.array(columns[6], pa.string()).cast(pa.timestamp('us')).cast(schema.field('start_time').type),
+                    pa.array(columns[7], pa.string()).cast(pa.timestamp('us')).cast(schema.field('end_time').type),
+                    pa.array(columns[8], pa.float64()),
+                    pa.array(columns[9], pa.float64()),
+                ], schema=schema))
+                written += len(rows)
+                yield written
+    finally:
+        conn.rollback()
+        conn.close()
+
+def export_sessions_columnar(export_format):
+    if import_pyarrow() is None:
+        return jsonify({"status": "error",
+                        "message": f"{export_format} export needs pyarrow on the server ('pip install pyarrow')."}), 501
+    start_date, end_date, artist_username = (request.args.get('start_date'), request.args.get('end_date'),
+                                             request.args.get('artist'))
+
+    def generate():
+        sink = ChunkSink()
+        for _ in write_sessions_columnar(sink, export_format, start_date, end_date, artist_username):
+            yield sink.drain()
+        yield sink.drain()  # the footer, written when the writer closes
+
+    filename = f"time_tracker_export_{datetime.utcnow().date().isoformat()}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=COLUMNAR_EXPORT_FORMATS[export_format],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+@app.route('/api/register', methods=['POST'])
+def register():
+    data = request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+    conn = get_db()
+    if conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
+        conn.close()
+        return jsonify({"status": "error", "message": f"User {username} is already registered."}), 409
+    conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
+                 (username, generate_password_hash(password)))
+    conn.commit()
+    conn.close()
+    return jsonify({"status": "success", "message": "User created successfully."}), 201
+
+@app.route('/api/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    username = data.get('username')
+    password = data.get('password')
+    conn = get_db()
+    user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+    conn.close()
+    if user is None or not check_password_hash(user['password_hash'], password):
+        return jsonify({"status": "error", "message": "Invalid username or password."}), 401
+    token, expires_at = issue_token(user['id'])
+    return jsonify({"status": "success", "user": {"id": user['id'], "username": user['username']},
+                    "token": token, "expires_at": expires_at})
+
+@app.route('/api/token/refresh', methods=['POST'])
+@require_token
+def refresh_token():
+    """Swaps a valid token for a new one, so a DCC that stays logged in never needs the password again."""
+    token, expires_at = issue_token(g.user_id)
+    return jsonify({"status": "success", "token": token, "expires_at": expires_at})
+
+@app.route('/api/session/start', methods=['POST'])
+@require_token
+def session_start():
+    data = request.get_json()
+    now = datetime.utcnow()
+    user_id = data.get('user_id', g.user_id)
+
+    if not is_token_user(user_id):
+        return jsonify({"status": "error", "message": "Sessions can only be started for the logged-in user."}), 403
+
+    conn = get_db()
+    with conn:
+        session_id = create_session_row(conn, dict(data, user_id=g.user_id), now)
+    conn.close()
+    return jsonify({"status": "success", "session_id": session_id}), 201
+
+@app.route('/api/session/pause', methods=['POST'])
+@require_token
+def session_pause():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    flush_heartbeats([coerce_session_id(session_id)])
+    conn = get_db()
+    with conn:
+        pause_session_row(conn, session_id, g.user_id, datetime.utcnow())
+    conn.close()
+    return jsonify({"status": "session_paused"})
+
+@app.route('/api/session/resume', methods=['POST'])
+@require_token
+def session_resume():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    flush_heartbeats([coerce_session_id(session_id)])
+    conn = get_db()
+    with conn:
+        resumed = resume_session_row(conn, session_id, g.user_id, datetime.utcnow())
+    conn.close()
+    if not resumed:
+        return jsonify({"status": "error", "message": "Session not found or not paused"}), 404
+    return jsonify({"status": "session_resumed"})
+
+
+@app.route('/api/session/heartbeat', methods=['POST'])
+@require_token
+def session_heartbeat():
+    data = request.get_json()
+    session_id = coerce_session_id(data.get('session_id'))
+    if session_id is not None:
+        buffer_heartbeat(session_id, g.user_id, datetime.utcnow())
+    return jsonify({"status": "acknowledged"})
+
+def parse_client_timestamp(value, now):
+    """
+    Parses an ISO timestamp sent by a client into a naive UTC datetime.
+    Missing or unparseable values fall back to `now`, and timestamps from
+    the future are clamped so a skewed clock can't extend a session.
+    """
+    if not value:
+        return now
+    try:
+        timestamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(timestamp, now)
+
+@app.route('/api/session/heartbeat_batch', methods=['POST'])
+@require_token
+def session_heartbeat_batch():
+    """
+    Accepts many heartbeats in one request and buffers them for the next flush.
+    Expects {"heartbeats": [{"session_id": 1, "timestamp": "<iso>"}, ...]}.
+    """
+    data = request.get_json(silent=True) or {}
+    heartbeats = data.get('heartbeats')
+    if not isinstance(heartbeats, list):
+        return jsonify({"status": "error", "message": "heartbeats must be a list."}), 400
+
+    now = datetime.utcnow()
+    # Keep only the latest heartbeat per session so each row is written once.
+    latest = {}
+    for beat in heartbeats:
+        if not isinstance(beat, dict):
+            continue
+        session_id = coerce_session_id(beat.get('session_id'))
+        if session_id is None:
+            continue
+        timestamp = parse_client_timestamp(beat.get('timestamp'), now)
+        if session_id not in latest or timestamp > latest[session_id]:
+            latest[session_id] = timestamp
+
+    for session_id, timestamp in latest.items():
+        buffer_heartbeat(session_id, g.user_id, timestamp)
+    return jsonify({"status": "acknowledged", "count": len(latest)})
+
+@app.route('/api/session/stop', methods=['POST'])
+@require_token
+def session_stop():
+    data = request.get_json()
+    session_id = data.get('session_id')
+    flush_heartbeats([coerce_session_id(session_id)])
+    conn = get_db()
+    with conn:
+        start_day = stop_session_row(conn, session_id, g.user_id, datetime.utcnow())
+    conn.close()
+    if start_day is None:
+        return jsonify({"status": "error", "message": "Session not found"}), 404
+    invalidate_dashboard_cache(start_day)
+    return jsonify({"status": "session_stopped"})
+
+@app.route('/api/session/sync', methods=['POST'])
+@require_token
+def session_sync():
+    """
+    Bulk-ingests session lifecycle events journaled by DCC clients.
+    Expects {"events": [{"key", "session_key", "type", "timestamp", ...}, ...]}
+    in the order they happened. Sessions are addressed by the client's
+    session_key, so events can be recorded before the server has seen the
+    session. Every event key is applied at most once, which makes replaying
+    a batch after a network failure safe. Heartbeats are not deduplicated
+    since they only move last_heartbeat forward. Events for a session the
+    reaper already closed go through continue_reaped_session_row.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({"status": "error", "message": "events must be a list."}), 400
+
+    now = datetime.utcnow()
+    session_ids = {}
+    foreign_keys = set()
+    heartbeats = {}
+    reaped_ids = set()
+    changed_days = set()
+    applied = 0
+
+    conn = get_db()
+    with conn:
+        for event in events:
+            if not isinstance(event, dict) or not event.get('session_key') or event.get('type') not in SYNC_EVENT_TYPES:
+                continue
+            event_type, session_key = event['type'], event['session_key']
+            at = parse_client_timestamp(event.get('timestamp'), now)
+
+            if session_key not in session_ids:
+                row = conn.execute('SELECT id, user_id, status FROM sessions WHERE client_key = ?', (session_key,)).fetchone()
+                if row and row['user_id'] != g.user_id:
+                    # Another user's session: skip its events rather than starting a second one under the same key.
+                    foreign_keys.add(session_key)
+                elif row and row['status'] == 'stopped':
+                    reaped_ids.add(row['id'])
+                session_ids[session_key] = row['id'] if row else None
+            if session_key in foreign_keys:
+                continue
+            session_id = session_ids[session_key]
+
+            # Only an event that will be applied may use up its key, so a start
+            # sent with the wrong token can still be applied by its own user.
+            if event_type == 'start':
+                # Sessions always belong to the token's user.
+                if session_id is not None or not is_token_user(event.get('user_id', g.user_id)):
+                    continue
+            elif session_id is None:
+                continue
+
+            if event_type != 'heartbeat':
+                if not event.get('key'):
+                    continue
+                inserted = conn.execute('INSERT OR IGNORE INTO ingested_events (event_key, received_at) VALUES (?, ?)',
+                                        (event['key'], now)).rowcount
+                if not inserted:
+                    continue
+
+            if event_type == 'start':
+                session_ids[session_key] = create_session_row(conn, dict(event, user_id=g.user_id), at,
+                                                              client_key=session_key)
+                applied += 1
+                continue
+
+            if session_id in reaped_ids:
+                new_session_id, start_day = continue_reaped_session_row(conn, session_id, g.user_id, event_type, at)
+                if start_day is not None:
+                    changed_days.add(start_day)
+                if new_session_id != session_id:
+                    reaped_ids.discard(session_id)
+                    session_ids[session_key] = new_session_id
+            elif event_type == 'heartbeat':
+                heartbeats[session_id] = max(at, heartbeats.get(session_id, at))
+            elif event_type == 'pause':
+                pause_session_row(conn, session_id, g.user_id, at)
+            elif event_type == 'resume':
+                resume_session_row(conn, session_id, g.user_id, at)
+            elif event_type == 'stop':
+                start_day = stop_session_row(conn, session_id, g.user_id, at)
+                if start_day is not None:
+                    changed_days.add(start_day)
+            applied += 1
+    conn.close()
+
+    for session_id, timestamp in heartbeats.items():
+        buffer_heartbeat(session_id, g.user_id, timestamp)
+    for day in changed_days:
+        invalidate_dashboard_cache(day)
+    known_sessions = {key: session_id for key, session_id in session_ids.items()
+                      if session_id is not None and key not in foreign_keys}
+    return jsonify({"status": "success", "received": len(events), "applied": applied, "sessions": known_sessions})
+
+@app.route('/api/session/events', methods=['POST'])
+@require_token
+def session_events():
+    """
+    Bulk-inserts activity events in one transaction.
+    Expects {"events": [{"session_id" or "session_key", "event_type", "event_data", "timestamp", "key"}, ...]}.
+    Events carrying a key are inserted at most once, so clients can safely resend a batch;
+    "accepted" counts only the events that were newly inserted.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({"status": "error", "message": "events must be a list."}), 400
+
+    now = datetime.utcnow()
+    conn = get_db()
+    session_ids = {}
+    rows = []
+    for event in events:
+        if not isinstance(event, dict) or not event.get('event_type'):
+            continue
+        # Events are only accepted for the token user's own sessions.
+        session_id = coerce_session_id(event.get('session_id'))
+        session_key = event.get('session_key')
+        if session_id is not None:
+            lookup = ('id', session_id)
+            if lookup not in session_ids:
+                row = conn.execute('SELECT id FROM sessions WHERE id = ? AND user_id = ?', (session_id, g.user_id)).fetchone()
+                session_ids[lookup] = row['id'] if row else None
+            session_id = session_ids[lookup]
+        elif session_key:
+            lookup = ('key', session_key)
+            if lookup not in session_ids:
+                row = conn.execute('SELECT id FROM sessions WHERE client_key = ? AND user_id = ?', (session_key, g.user_id)).fetchone()
+                session_ids[lookup] = row['id'] if row else None
+            session_id = session_ids[lookup]
+        if session_id is None:
+            continue
+        event_data = event.get('event_data')
+        if event_data is not None and not isinstance(event_data, str):
+            event_data = json.dumps(event_data)
+        rows.append((session_id, parse_client_timestamp(event.get('timestamp'), now),
+                     str(event['event_type']), event_data, event.get('key')))
+
+    with conn:
+        # rowcount leaves out rows ignored as already-seen event keys.
+        accepted = conn.executemany('INSERT OR IGNORE INTO activity_events (session_id, timestamp, event_type, event_data, event_key) VALUES (?, ?, ?, ?, ?)',
+                                    rows).rowcount if rows else 0
+    conn.close()
+    return jsonify({"status": "success", "received": len(events), "accepted": accepted})
+
+@app.route('/api/reaper_stats', methods=['GET'])
+def reaper_stats():
+    """Reports how long the stale session reaper took and how many sessions it closed."""
+    return jsonify({"status": "success", "reaper": dict(_reaper_stats)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, SQLite, session and cache metrics."""
+    conn = get_db()
+    session_counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM sessions WHERE status IN ('active', 'paused') GROUP BY status").fetchall())
+    conn.close()
+
+    lines = [
+        "# HELP tracker_http_requests_total Requests handled, by route and status code.",
+        "# TYPE tracker_http_requests_total counter",
+    ]
+    with _metrics_lock:
+        request_metrics = sorted(_request_metrics.items())
+        for (method, route), metrics in request_metrics:
+            for status, count in sorted(metrics["statuses"].items()):
+                lines.append(f'tracker_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        lines += [
+            "# HELP tracker_http_request_errors_total Requests that ended in a 5xx response.",
+            "# TYPE tracker_http_request_errors_total counter",
+        ]
+        for (method, route), metrics in request_metrics:
+            lines.append(f'tracker_http_request_errors_total{{method="{method}",route="{route}"}} {metrics["errors"]}')
+        lines += [
+            "# HELP tracker_http_request_duration_seconds Time spent handling a request.",
+            "# TYPE tracker_http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in request_metrics:
+            lines += metrics["latency"].render("tracker_http_request_duration_seconds", f'method="{method}",route="{route}"')
+        lines += [
+            "# HELP tracker_db_duration_seconds Time spent in SQLite statements and commits.",
+            "# TYPE tracker_db_duration_seconds histogram",
+        ]
+        for (operation, statement), histogram in sorted(_db_metrics.items()):
+            lines += histogram.render("tracker_db_duration_seconds", f'operation="{operation}",statement="{statement}"')
+        reaper_duration = _reaper_metrics["duration"].render("tracker_reaper_run_duration_seconds")
+        reaper_finished_at = _reaper_metrics["finished_at"]
+
+    with _heartbeat_lock:
+        buffered_heartbeats = len(_heartbeat_buffer)
+    with _dashboard_cache_lock:
+        cache_hits, cache_misses = _dashboard_cache_counters['hits'], _dashboard_cache_counters['misses']
+    lines += [
+        "# HELP tracker_sessions Sessions currently open, by status.",
+        "# TYPE tracker_sessions gauge",
+        f'tracker_sessions{{status="active"}} {session_counts.get("active", 0)}',
+        f'tracker_sessions{{status="paused"}} {session_counts.get("paused", 0)}',
+        "# HELP tracker_buffered_heartbeats Heartbeats waiting to be flushed to the database.",
+        "# TYPE tracker_buffered_heartbeats gauge",
+        f"tracker_buffered_heartbeats {buffered_heartbeats}",
+        "# HELP tracker_db_pool_idle_connections Pooled SQLite connections not in use.",
+        "# TYPE tracker_db_pool_idle_connections gauge",
+        f"tracker_db_pool_idle_connections {len(_db_pool)}",
+        "# HELP tracker_dashboard_cache_lookups_total dashboard_stats cache lookups, by result.",
+        "# TYPE tracker_dashboard_cache_lookups_total counter",
+        f'tracker_dashboard_cache_lookups_total{{result="hit"}} {cache_hits}',
+        f'tracker_dashboard_cache_lookups_total{{result="miss"}} {cache_misses}',
+        "# HELP tracker_reaped_sessions_total Stale sessions closed by the reaper.",
+        "# TYPE tracker_reaped_sessions_total counter",
+        f"tracker_reaped_sessions_total {_reaper_stats['total_closed']}",
+        "# HELP tracker_reaper_run_duration_seconds Time taken by each stale session reaper run.",
+        "# TYPE tracker_reaper_run_duration_seconds histogram",
+        *reaper_duration,
+        "# HELP tracker_reaper_last_run_timestamp_seconds When the reaper last finished a run, as Unix time; 0 before the first run.",
+        "# TYPE tracker_reaper_last_run_timestamp_seconds gauge",
+        f"tracker_reaper_last_run_timestamp_seconds {reaper_finished_at:.3f}",
+        "# HELP tracker_reaper_last_run_closed_sessions Stale sessions closed by the reaper's last run.",
+        "# TYPE tracker_reaper_last_run_closed_sessions gauge",
+        f"tracker_reaper_last_run_closed_sessions {_reaper_stats['last_closed']}",
+    ]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+@app.route('/api/get_logs', methods=['GET'])
+def get_logs():
+    user_id = request.args.get('user_id')
+    date = request.args.get('date')
+    conn = get_db()
+    rows = conn.execute("""
+        SELECT s.id, u.username, s.app_name, s.session_name, t.task_name, s.start_time, s.end_time, s.duration
+        FROM sessions s 
+        JOIN users u ON s.user_id = u.id
+        LEFT JOIN tasks t ON s.task_id = t.id
+        WHERE s.user_id = ? AND s.start_day = ? AND s.status = "stopped"
+        ORDER BY s.start_time
+    """, (user_id, date)).fetchall()
+    conn.close()
+    return jsonify({"status": "success", "logs": tabular(rows)})
+
+LOGS_RANGE_MAX_DAYS = 366
+
+@app.route('/api/get_logs_range', methods=['GET'])
+def get_logs_range():
+    """
+    Returns a user's stopped sessions from start_date to end_date (inclusive)
+    plus per-day totals, so a week or month costs one request instead of one per day.
+    Each log carries its start_day. Days without sessions are left out of "days".
+    """
+    user_id = request.args.get('user_id')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not user_id or not start_date or not end_date:
+        return jsonify({"status": "error", "message": "user_id, start_date and end_date are required."}), 400
+    try:
+        span = (datetime.strptime(end_date, '%Y-%m-%d') - datetime.strptime(start_date, '%Y-%m-%d')).days
+    except ValueError:
+        return jsonify({"status": "error", "message": "Dates must be YYYY-MM-DD."}), 400
+    if span < 0 or span >= LOGS_RANGE_MAX_DAYS:
+        return jsonify({"status": "error", "message": f"The range must cover 1 to {LOGS_RANGE_MAX_DAYS} days."}), 400
+
+    conn = get_db()
+    rows = conn.execute("""
+        SELECT s.id, s.start_day, u.username, s.app_name, s.session_name, t.task_name, s.start_time, s.end_time, s.duration
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        LEFT JOIN tasks t ON s.task_id = t.id
+        WHERE s.user_id = ? AND s.start_day BETWEEN ? AND ? AND s.status = "stopped"
+        ORDER BY s.start_time
+    """, (user_id, start_date, end_date)).fetchall()
+    conn.close()
+
+    logs = [dict(row) for row in rows]
+    days = {}
+    for log in logs:
+        totals = days.setdefault(log['start_day'], {"day": log['start_day'], "total_duration": 0.0, "session_count": 0})
+        totals["total_duration"] += log['duration'] or 0
+        totals["session_count"] += 1
+    return jsonify({"status": "success", "start_date": start_date, "end_date": end_date,
+                    "logs": tabular(logs), "days": tabular(list(days.values()))})
+
+@app.route('/api/get_session_events', methods=['GET'])
+def get_session_events():
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({"status": "error", "message": "session_id parameter is required"}), 400
+    conn = get_db()
+    rows = conn.execute("SELECT timestamp, event_type, event_data FROM activity_events WHERE session_id = ? ORDER BY timestamp",
+                        (session_id,)).fetchall()
+    conn.close()
+    return jsonify({"status": "success", "events": tabular(rows)})
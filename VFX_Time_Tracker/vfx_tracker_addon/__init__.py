@@ -1,227 +1,337 @@
-bl_info = {
-    "name": "VFX Time Tracker",
-    "author": "Your Name",
-    "version": (1, 7, 0), # Activity-based idle detection
-    "blender": (2, 80, 0),
-    "location": "View3D > Sidebar > VFX Time Tracker",
-    "description": "Log in and track time for VFX projects.",
-    "warning": "",
-    "doc_url": "",
-    "category": "3D View",
-}
-
-import bpy
-import sys
-import os
-import atexit
-from bpy.app.handlers import persistent
-from bpy.props import StringProperty, PointerProperty, EnumProperty
-from bpy.types import PropertyGroup, Scene
-
-# Add the addon's directory to the python path
-addon_dir = os.path.dirname(__file__)
-if addon_dir not in sys.path:
-    sys.path.append(addon_dir)
-
-# Import the dcc_client module 
-import dcc_client
-
-# Global variables 
-tracker_instance = None
-task_list = []
-
-# UI and Properties Classes
-
-def get_tasks_for_enum(self, context):
-    """Callback function for the EnumProperty to display tasks."""
-    global task_list
-    if not task_list:
-        return [("0", "No Tasks Found", "Log in to fetch tasks")]
-    return [(str(task['id']), task['task_name'], "") for task in task_list]
-
-class TrackerProperties(PropertyGroup):
-    """Stores the add-on's properties for the UI."""
-    username: StringProperty(name="Username", default="") # type: ignore
-    password: StringProperty(name="Password", default="", subtype='PASSWORD') # type: ignore
-    login_status: StringProperty(name="Status", default="Logged Out") # type: ignore
-    task_enum: EnumProperty(name="Task", items=get_tasks_for_enum) # type: ignore
-
-class LoginOperator(bpy.types.Operator):
-    """Operator to handle the login button press."""
-    bl_idname = "vfx_tracker.login"
-    bl_label = "Login"
-
-    def execute(self, context):
-        global tracker_instance, task_list
-        props = context.scene.vfx_tracker_props
-        
-        if not props.username or not props.password:
-            self.report({'WARNING'}, "Username and password cannot be empty.")
-            return {'CANCELLED'}
-
-        tracker_instance = dcc_client.DCCClient("blender")
-        if tracker_instance.login(props.username, props.password):
-            props.login_status = f"Logged in as: {props.username}"
-            task_list = tracker_instance.get_tasks()
-            self.report({'INFO'}, "Login successful! Select a task to start.")
-        else:
-            props.login_status = "Login Failed"
-            self.report({'ERROR'}, "Login failed.")
-        
-        return {'FINISHED'}
-
-class StartTrackingOperator(bpy.types.Operator):
-    """Operator to start a tracking session."""
-    bl_idname = "vfx_tracker.start_tracking"
-    bl_label = "Start Tracking"
-
-    def execute(self, context):
-        start_new_session()
-        return {'FINISHED'}
-
-class StopTrackingOperator(bpy.types.Operator):
-    """Operator to stop a tracking session and log out."""
-    bl_idname = "vfx_tracker.stop_tracking"
-    bl_label = "Stop Tracking"
-
-    def execute(self, context):
-        global tracker_instance
-        props = context.scene.vfx_tracker_props
-        if tracker_instance:
-            tracker_instance.stop_session()
-            tracker_instance = None
-            props.login_status = "Logged Out"
-        kill_activity_handlers()
-        self.report({'INFO'}, "Tracking stopped and logged out.")
-        return {'FINISHED'}
-
-class VFXTrackerPanel(bpy.types.Panel):
-    """Creates the main UI Panel in the 3D View's Sidebar."""
-    bl_label = "VFX Time Tracker"
-    bl_idname = "VIEW3D_PT_vfx_tracker"
-    bl_space_type = 'VIEW_3D'
-    bl_region_type = 'UI'
-    bl_category = 'VFX Time Tracker'
-
-    def draw(self, context):
-        layout = self.layout
-        props = context.scene.vfx_tracker_props
-        layout.label(text=props.login_status)
-        layout.separator()
-        
-        is_logged_in = tracker_instance and tracker_instance.user_info
-        is_tracking = is_logged_in and tracker_instance.session_id
-
-        if not is_logged_in:
-            layout.prop(props, "username")
-            layout.prop(props, "password")
-            layout.operator("vfx_tracker.login")
-        else:
-            layout.prop(props, "task_enum")
-            if not is_tracking:
-                layout.operator("vfx_tracker.start_tracking")
-            else:
-                layout.label(text="Session is active.")
-                layout.operator("vfx_tracker.start_tracking", text="Change Task")
-                layout.operator("vfx_tracker.stop_tracking")
-
-# Heartbeat and Session Management
-
-def send_heartbeat(dummy):
-    """Function called by activity handlers to send a heartbeat."""
-    if tracker_instance and tracker_instance.session_id:
-        tracker_instance.send_heartbeat()
-
-def start_new_session():
-    """Starts a new session based on the UI selection."""
-    global tracker_instance
-
-    if not tracker_instance or not tracker_instance.user_info:
-        return
-
-    if tracker_instance.session_id:
-        tracker_instance.stop_session()
-
-    kill_activity_handlers() # Ensure old handlers are cleared
-
-    props = bpy.context.scene.vfx_tracker_props
-    selected_task_id = int(props.task_enum) if props.task_enum.isdigit() and int(props.task_enum) > 0 else None
-    filepath = bpy.data.filepath
-    project_name = os.path.basename(os.path.dirname(filepath)) if filepath else "blender_project"
-    scene_name = os.path.basename(filepath) if filepath else "Unsaved Scene"
-
-    tracker_instance.start_session(project_name, scene_name, selected_task_id)
-    setup_activity_handlers() # Start sending heartbeats for the new session
-
-# Activity Handlers 
-_activity_handlers = []
-
-def setup_activity_handlers():
-    """
-    Registers handlers for events that signify user activity.
-    These will call the send_heartbeat function.
-    """
-    global _activity_handlers
-    kill_activity_handlers() # Make sure we start fresh
-
-    # A list of handler lists in bpy.app.handlers
-    handler_owners = [
-        bpy.app.handlers.render_post,
-        bpy.app.handlers.save_post,
-        bpy.app.handlers.depsgraph_update_post,
-        bpy.app.handlers.frame_change_post
-    ]
-
-    for handler_list in handler_owners:
-        handler_list.append(send_heartbeat)
-        _activity_handlers.append((handler_list, send_heartbeat))
-    
-    print(f"Activity handlers registered.")
-
-def kill_activity_handlers():
-    """Removes all registered activity handlers."""
-    global _activity_handlers
-    for handler_list, func in _activity_handlers:
-        if func in handler_list:
-            handler_list.remove(func)
-    _activity_handlers = []
-    print("Activity handlers killed.")
-
-
-@persistent
-def on_blender_exit():
-    """Fallback for when Blender is about to close."""
-    global tracker_instance
-    if tracker_instance:
-        tracker_instance.stop_session()
-
-# Registration
-
-classes = (
-    TrackerProperties,
-    LoginOperator,
-    StartTrackingOperator,
-    StopTrackingOperator,
-    VFXTrackerPanel,
-)
-
-def register():
-    """Registers the add-on, its UI, and callbacks."""
-    for cls in classes:
-        bpy.utils.register_class(cls)
-    Scene.vfx_tracker_props = PointerProperty(type=TrackerProperties)
-    atexit.register(on_blender_exit)
-    print("VFX Time Tracker: Add-on registered successfully.")
-
-def unregister():
-    """Unregisters the add-on and removes callbacks."""
-    kill_activity_handlers()
-    try:
-        atexit.unregister(on_blender_exit)
-    except Exception:
-        pass
-        
-    for cls in reversed(classes):
-        bpy.utils.unregister_class(cls)
-    del Scene.vfx_tracker_props
-    print("VFX Time Tracker: Add-on unregistered.")
+bl_info = {
+    "name": "VFX Time Tracker",
+    "author": "Your Name",
+    "version": (1, 7, 0), # Activity-based idle detection
+    "blender": (2, 80, 0),
+    "location": "View3D > Sidebar > VFX Time Tracker",
+    "description": "Log in and track time for VFX projects.",
+    "warning": "",
+    "doc_url": "",
+    "category": "3D View",
+}
+
+import bpy
+import sys
+import os
+import time
+import atexit
+from bpy.app.handlers import persistent
+from bpy.props import StringProperty, PointerProperty, EnumProperty
+from bpy.types import PropertyGroup, Scene
+
+# Add the addon's directory to the python path
+addon_dir = os.path.dirname(__file__)
+if addon_dir not in sys.path:
+    sys.path.append(addon_dir)
+
+# Import the dcc_client module 
+import dcc_client
+
+# Global variables 
+tracker_instance = None
+task_list = []
+task_list_version = 0 # Bumped whenever task_list is replaced
+_task_refresh_thread = None # Background revalidation of the cached task list
+_shown_tasks_version = None # tasks_version of the list in task_list
+
+# Enum items are built once per task list version, not on every redraw.
+# Blender also needs Python to keep a reference to the item strings.
+_task_enum_items = []
+_task_enum_version = None
+
+# UI and Properties Classes
+
+def get_tasks_for_enum(self, context):
+    """Callback function for the EnumProperty to display tasks."""
+    global _task_enum_items, _task_enum_version
+    if _task_enum_version != task_list_version:
+        if not task_list:
+            _task_enum_items = [("0", "No Tasks Found", "Log in to fetch tasks")]
+        else:
+            _task_enum_items = [(str(task['id']), task['task_name'], "") for task in task_list]
+        _task_enum_version = task_list_version
+    return _task_enum_items
+
+def set_task_list(tasks):
+    """Replaces the task list, invalidating the cached enum items if it changed."""
+    global task_list, task_list_version
+    if tasks != task_list:
+        task_list = tasks
+        task_list_version += 1
+
+def show_tasks(client):
+    """Shows the client's cached task list now and revalidates it in the background."""
+    global _task_refresh_thread, _shown_tasks_version
+    set_task_list(client.get_cached_tasks())
+    _shown_tasks_version = client.tasks_version
+    _task_refresh_thread = client.refresh_tasks()
+    if not bpy.app.timers.is_registered(task_refresh_timer):
+        bpy.app.timers.register(task_refresh_timer, first_interval=0.5)
+
+def task_refresh_timer():
+    """bpy.app.timers callback that picks up the revalidated task list on the main thread."""
+    global _shown_tasks_version
+    if _task_refresh_thread and _task_refresh_thread.is_alive():
+        return 0.5
+    if tracker_instance and tracker_instance.tasks_version != _shown_tasks_version:
+        _shown_tasks_version = tracker_instance.tasks_version
+        set_task_list(tracker_instance.get_cached_tasks())
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    return None # Unregisters the timer
+
+class TrackerProperties(PropertyGroup):
+    """Stores the add-on's properties for the UI."""
+    username: StringProperty(name="Username", default="") # type: ignore
+    password: StringProperty(name="Password", default="", subtype='PASSWORD') # type: ignore
+    login_status: StringProperty(name="Status", default="Logged Out") # type: ignore
+    task_enum: EnumProperty(name="Task", items=get_tasks_for_enum) # type: ignore
+
+class LoginOperator(bpy.types.Operator):
+    """Operator to handle the login button press."""
+    bl_idname = "vfx_tracker.login"
+    bl_label = "Login"
+
+    def execute(self, context):
+        global tracker_instance
+        props = context.scene.vfx_tracker_props
+        
+        if not props.username or not props.password:
+            if restore_saved_login():
+                self.report({'INFO'}, "Logged in with a saved token. Select a task to start.")
+                return {'FINISHED'}
+            self.report({'WARNING'}, "Username and password cannot be empty.")
+            return {'CANCELLED'}
+
+        if tracker_instance:
+            tracker_instance.close()
+        tracker_instance = dcc_client.DCCClient("blender")
+        if tracker_instance.login(props.username, props.password):
+            props.login_status = f"Logged in as: {props.username}"
+            show_tasks(tracker_instance)
+            self.report({'INFO'}, "Login successful! Select a task to start.")
+        else:
+            props.login_status = "Login Failed"
+            self.report({'ERROR'}, "Login failed.")
+        
+        return {'FINISHED'}
+
+def restore_saved_login():
+    """Logs in with the token saved by an earlier login, if it is still valid. Returns True on success."""
+    global tracker_instance
+    client = dcc_client.DCCClient("blender")
+    if not client.restore_login():
+        client.close()
+        return False
+    if tracker_instance:
+        tracker_instance.close()
+    tracker_instance = client
+    bpy.context.scene.vfx_tracker_props.login_status = f"Logged in as: {client.user_info['username']}"
+    show_tasks(client)
+    return True
+
+def restore_login_timer():
+    """Runs once after the add-on loads, when bpy.context.scene is available."""
+    if not tracker_instance:
+        restore_saved_login()
+    return None
+
+class StartTrackingOperator(bpy.types.Operator):
+    """Operator to start a tracking session."""
+    bl_idname = "vfx_tracker.start_tracking"
+    bl_label = "Start Tracking"
+
+    def execute(self, context):
+        start_new_session()
+        return {'FINISHED'}
+
+class StopTrackingOperator(bpy.types.Operator):
+    """Operator to stop a tracking session and log out."""
+    bl_idname = "vfx_tracker.stop_tracking"
+    bl_label = "Stop Tracking"
+
+    def execute(self, context):
+        global tracker_instance
+        props = context.scene.vfx_tracker_props
+        if tracker_instance:
+            tracker_instance.stop_session()
+            tracker_instance.logout()
+            tracker_instance.close()
+            tracker_instance = None
+            props.login_status = "Logged Out"
+        kill_activity_handlers()
+        self.report({'INFO'}, "Tracking stopped and logged out.")
+        return {'FINISHED'}
+
+class VFXTrackerPanel(bpy.types.Panel):
+    """Creates the main UI Panel in the 3D View's Sidebar."""
+    bl_label = "VFX Time Tracker"
+    bl_idname = "VIEW3D_PT_vfx_tracker"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'VFX Time Tracker'
+
+    def draw(self, context):
+        layout = self.layout
+        props = context.scene.vfx_tracker_props
+        layout.label(text=props.login_status)
+        layout.separator()
+        
+        is_logged_in = tracker_instance and tracker_instance.user_info
+        is_tracking = is_logged_in and tracker_instance.is_tracking
+
+        if not is_logged_in:
+            layout.prop(props, "username")
+            layout.prop(props, "password")
+            layout.operator("vfx_tracker.login")
+        else:
+            layout.prop(props, "task_enum")
+            if not is_tracking:
+                layout.operator("vfx_tracker.start_tracking")
+            else:
+                layout.label(text="Session is active.")
+                layout.operator("vfx_tracker.start_tracking", text="Change Task")
+                layout.operator("vfx_tracker.stop_tracking")
+
+# Heartbeat and Session Management
+# depsgraph and frame-change handlers fire many times a second, so they only
+# record when activity happened. A timer turns that into at most one
+# heartbeat per ACTIVITY_SAMPLE_INTERVAL.
+ACTIVITY_SAMPLE_INTERVAL = 10.0 # seconds
+_last_activity_time = 0.0
+_last_reported_activity_time = 0.0
+
+def record_activity(*args):
+    """Function called by activity handlers. Only stores a timestamp."""
+    global _last_activity_time
+    _last_activity_time = time.monotonic()
+
+def log_scene_save(*args):
+    """save_post handler that records a scene_save activity event."""
+    if tracker_instance and tracker_instance.is_tracking:
+        tracker_instance.log_event("scene_save", bpy.data.filepath)
+
+def log_render(*args):
+    """render_post handler that records a render activity event."""
+    if tracker_instance and tracker_instance.is_tracking:
+        tracker_instance.log_event("render", bpy.data.filepath)
+
+def activity_timer():
+    """bpy.app.timers callback that sends a heartbeat if there was activity since the last one."""
+    global _last_reported_activity_time
+    if not tracker_instance or not tracker_instance.is_tracking:
+        return None # Unregisters the timer
+    if _last_activity_time > _last_reported_activity_time:
+        _last_reported_activity_time = _last_activity_time
+        tracker_instance.send_heartbeat()
+    return ACTIVITY_SAMPLE_INTERVAL
+
+def start_new_session():
+    """Starts a new session based on the UI selection."""
+    global tracker_instance
+
+    if not tracker_instance or not tracker_instance.user_info:
+        return
+
+    if tracker_instance.is_tracking:
+        tracker_instance.stop_session()
+
+    kill_activity_handlers() # Ensure old handlers are cleared
+
+    props = bpy.context.scene.vfx_tracker_props
+    selected_task_id = int(props.task_enum) if props.task_enum.isdigit() and int(props.task_enum) > 0 else None
+    filepath = bpy.data.filepath
+    project_name = os.path.basename(os.path.dirname(filepath)) if filepath else "blender_project"
+    scene_name = os.path.basename(filepath) if filepath else "Unsaved Scene"
+
+    tracker_instance.start_session(project_name, scene_name, selected_task_id)
+    setup_activity_handlers() # Start sending heartbeats for the new session
+
+# Activity Handlers 
+_activity_handlers = []
+
+def setup_activity_handlers():
+    """
+    Registers handlers for events that signify user activity.
+    These record activity, and activity_timer sends the heartbeats.
+    """
+    global _activity_handlers
+    kill_activity_handlers() # Make sure we start fresh
+
+    # A list of handler lists in bpy.app.handlers
+    handler_owners = [
+        bpy.app.handlers.render_post,
+        bpy.app.handlers.save_post,
+        bpy.app.handlers.depsgraph_update_post,
+        bpy.app.handlers.frame_change_post
+    ]
+
+    for handler_list in handler_owners:
+        handler_list.append(record_activity)
+        _activity_handlers.append((handler_list, record_activity))
+
+    # Handlers that also log an activity event (buffered and sent in batches)
+    for handler_list, func in [(bpy.app.handlers.save_post, log_scene_save), (bpy.app.handlers.render_post, log_render)]:
+        handler_list.append(func)
+        _activity_handlers.append((handler_list, func))
+
+    bpy.app.timers.register(activity_timer, first_interval=ACTIVITY_SAMPLE_INTERVAL, persistent=True)
+    
+    print(f"Activity handlers registered.")
+
+def kill_activity_handlers():
+    """Removes all registered activity handlers."""
+    global _activity_handlers
+    for handler_list, func in _activity_handlers:
+        if func in handler_list:
+            handler_list.remove(func)
+    _activity_handlers = []
+    if bpy.app.timers.is_registered(activity_timer):
+        bpy.app.timers.unregister(activity_timer)
+    print("Activity handlers killed.")
+
+
+@persistent
+def on_blender_exit():
+    """Fallback for when Blender is about to close."""
+    global tracker_instance
+    if tracker_instance:
+        tracker_instance.stop_session()
+        tracker_instance.flush(timeout=5) # Give the queued stop a chance to reach the server
+
+# Registration
+
+classes = (
+    TrackerProperties,
+    LoginOperator,
+    StartTrackingOperator,
+    StopTrackingOperator,
+    VFXTrackerPanel,
+)
+
+def register():
+    """Registers the add-on, its UI, and callbacks."""
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    Scene.vfx_tracker_props = PointerProperty(type=TrackerProperties)
+    atexit.register(on_blender_exit)
+    bpy.app.timers.register(restore_login_timer, first_interval=1.0)
+    print("VFX Time Tracker: Add-on registered successfully.")
+
+def unregister():
+    """Unregisters the add-on and removes callbacks."""
+    kill_activity_handlers()
+    for timer in (restore_login_timer, task_refresh_timer):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+    try:
+        atexit.unregister(on_blender_exit)
+    except Exception:
+        pass
+        
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
+    del Scene.vfx_tracker_props
+    print("VFX Time Tracker: Add-on unregistered.")